@@ -0,0 +1,197 @@
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import JSONResponse, Response
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+import main
+from auth import (ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_current_user, get_password_hash_async,
+                  oauth2_scheme, token_cache, verify_password_async)
+from binary_io import BINARY_MIMETYPES
+from database import AsyncSessionLocal, get_async_db
+from model_registry import UnavailableModelError, UnknownModelError
+from models import User
+from models.schemas import UserCreate, UserLogin, UserResponse
+from rate_limit import retry_after_header
+from revocation import revocation_list
+from tokens import decode_access_token
+from utils import get_energy_data_for_portugal_async
+
+# One ASGI application: /evaluate, /predict and the auth routes are async handlers here, every
+# other route is served by the Flask app mounted underneath. Run with
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+# or `uvicorn asgi:app --workers 4`.
+
+# /predict bodies up to this many rows are scored on the event loop instead of a worker thread
+PREDICT_INLINE_MAX_ROWS = int(os.environ.get('PREDICT_INLINE_MAX_ROWS', 256))
+
+@asynccontextmanager
+async def lifespan(app):
+    # One connection pool per worker for the energy API
+    app.state.http = httpx.AsyncClient()
+    if main.MODEL_WATCH_INTERVAL > 0:
+        main.model_holder.watch(main.MODEL_WATCH_INTERVAL)
+    yield
+    await app.state.http.aclose()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+def error(message, status_code=400, headers=None):
+    return JSONResponse({'error': message}, status_code=status_code, headers=headers)
+
+def bearer_subject(request):
+    payload = main.token_payload(request.headers.get('authorization'))
+    return payload.get('sub') if payload else None
+
+def rate_limited(request, endpoint):
+    # Checked before the body is read, like main.rate_limited
+    if main.rate_limiter is None:
+        return None
+    ip = main.client_address(request.headers.get('x-forwarded-for'), request.client.host if request.client else None)
+    content_length = request.headers.get('content-length')
+    content_length = int(content_length) if content_length and content_length.isdigit() else None
+    retry_after = main.rate_limiter.check(endpoint, content_length, user=bearer_subject(request), ip=ip)
+    if not retry_after:
+        return None
+    return JSONResponse({'error': 'Too many requests', 'retry_after': retry_after}, status_code=429,
+                        headers={'Retry-After': retry_after_header(retry_after)})
+
+async def user_id_for(email):
+    if email is None:
+        return None
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(User.id).where(User.email == email))).scalar()
+
+@app.post('/evaluate')
+async def evaluate_digital_twin(request: Request):
+    limited = rate_limited(request, 'evaluate')
+    if limited:
+        return limited
+    email = bearer_subject(request)
+    try:
+        data = await request.json()
+        components_data = data.get('components', [])
+        components = main.parse_components(components_data)
+        energy_data = await get_energy_data_for_portugal_async(main.ENERGY_API_KEY, request.app.state.http)
+        twin, score, classification, detailed_scores = main.evaluate_twin(components, energy_data)
+        try:
+            user_id = await user_id_for(email)
+        except Exception as e:
+            print(f"Could not resolve the evaluating user: {e}")
+            user_id = None
+        # The history queue is bounded and blocks when full, so enqueue from a worker thread
+        await run_in_threadpool(main.record_evaluation, data, twin, score, classification, detailed_scores,
+                                resolve_user_id=lambda: user_id)
+
+        return main.evaluation_response(score, classification, detailed_scores)
+
+    except Exception as e:
+        return error(str(e))
+
+@app.post('/predict')
+async def make_prediction(request: Request):
+    model_name = request.query_params.get('model')
+    try:
+        if model_name:
+            model = main.model_registry.get(model_name, request.query_params.get('version'))
+        else:
+            model = main.model_holder.get()
+    except UnknownModelError as e:
+        return error(str(e), 404)
+    except UnavailableModelError as e:
+        return error(str(e), 503)
+
+    limited = rate_limited(request, 'predict')
+    if limited:
+        return limited
+
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    body = await request.body()
+    try:
+        if mimetype in BINARY_MIMETYPES:
+            X, typecode = main.prediction_rows(model, mimetype, body=body)
+        else:
+            X, typecode = main.prediction_rows(model, mimetype, data=json.loads(body) if body else None)
+    except ValueError as e:
+        # FeatureSchemaError, BinaryFormatError, PredictRequestError and malformed JSON
+        return error(str(e))
+
+    # Answer in binary only when the client prefers it over JSON
+    response_type = parse_accept_header(request.headers.get('accept'), MIMEAccept).best
+    explain = request.query_params.get('explain') in ('1', 'true')
+    batched = not model_name and main.batcher is not None
+    try:
+        if batched or len(X) > PREDICT_INLINE_MAX_ROWS:
+            # Waiting on the micro-batcher, or scoring a large body, happens off the event loop
+            result, result_type = await run_in_threadpool(
+                main.prediction_result, model, X, typecode, explain, response_type, batched)
+        else:
+            # Small bodies score in tens of microseconds, less than the hop to a worker thread
+            result, result_type = main.prediction_result(model, X, typecode, explain, response_type, False)
+    except main.PredictRequestError as e:
+        return error(str(e))
+    if result_type is None:
+        return JSONResponse(result)
+    return Response(result, media_type=result_type)
+
+def token_response(user):
+    expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token({"sub": user.email}, expires_delta=expires_delta)
+    return {"access_token": access_token, "token_type": "bearer"}
+
+async def authenticate(db, email, password):
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if user is None or not await verify_password_async(password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+@app.post('/auth/register', response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if (await db.execute(select(User.id).where(User.email == user.email))).scalar() is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    db_user = User(email=user.email, name=user.name, hashed_password=await get_password_hash_async(user.password))
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    # Drops the "no such user" entry a failed login may have cached for this email
+    token_cache.invalidate_user(user.email)
+    return UserResponse(id=db_user.id, email=db_user.email, name=db_user.name)
+
+@app.post('/token')
+async def login_for_access_token(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return token_response(await authenticate(db, form.username, form.password))
+
+@app.post('/auth/login')
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    return token_response(await authenticate(db, credentials.email, credentials.password))
+
+@app.get('/users/me', response_model=UserResponse)
+async def read_current_user(user: User = Depends(get_current_user)):
+    return UserResponse(id=user.id, email=user.email, name=user.name)
+
+@app.post('/auth/revoke')
+async def revoke_token(token: str = Depends(oauth2_scheme), user: User = Depends(get_current_user)):
+    payload = decode_access_token(token)
+    if payload.get('jti') is None or 'exp' not in payload:
+        return error('token has no jti and cannot be revoked')
+    await run_in_threadpool(revocation_list.revoke, payload['jti'], datetime.utcfromtimestamp(payload['exp']))
+    return {'revoked': payload['jti']}
+
+app.mount('/', WSGIMiddleware(main.app))
@@ -1,50 +1,91 @@
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from jose import JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User
-from database import get_db
+from database import get_async_db
+from passwords import get_password_hash, pwd_context, verify_password
+from revocation import revocation_list
+from token_cache import token_cache
+from tokens import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, decode_access_token
 
-SECRET_KEY = "your-secret-key-here"  
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# bcrypt releases the GIL, so a few threads hash in parallel without blocking the event loop
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", 64))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+class PasswordHashPool:
+    # Bounded pool for the deliberately slow bcrypt calls. Beyond workers + queue_limit pending calls
+    # new ones are refused with 503 instead of queueing without limit during a login storm.
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_limit=PASSWORD_HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        self._pid = None
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    def _pool(self):
+        # Created lazily so each forked server worker owns its threads
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            self._pid = os.getpid()
+        return self._executor
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self._slots.release()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+password_hash_pool = PasswordHashPool()
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str):
+    return await password_hash_pool.run(get_password_hash, password)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Revocation is checked on every call, cached or not; it is an in-memory lookup
+    cached = token_cache.get(token)
+    if cached is not None:
+        cached_user, jti = cached
+        if revocation_list.is_revoked(jti):
+            raise credentials_exception
+        return cached_user
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    if token_cache.is_unknown(email):
+        raise credentials_exception
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if user is None:
+        token_cache.mark_unknown(email)
         raise credentials_exception
+    if "exp" in payload:
+        token_cache.put(token, user, email, payload["exp"], payload.get("jti"))
     return user
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from predict import check_rows, predict_batch
+
+
+class BatchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        # Batch sizes bucketed by power of two: "1", "2", "4", ... upper bounds
+        self.histogram = {}
+
+    def record(self, requests, rows):
+        bucket = 1
+        while bucket < rows:
+            bucket *= 2
+        with self._lock:
+            self.batches += 1
+            self.requests += requests
+            self.rows += rows
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'requests': self.requests,
+                'rows': self.rows,
+                'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+                'mean_requests_per_batch': self.requests / self.batches if self.batches else 0.0,
+                'max_batch_rows': self.max_batch_rows,
+                'batch_rows_histogram': {f'<={k}': v for k, v in sorted(self.histogram.items())},
+            }
+
+
+class MicroBatcher:
+    def __init__(self, get_model, max_wait_ms=2.0, max_batch_rows=256):
+        self.get_model = get_model
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.stats = BatchStats()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, rows):
+        rows = list(rows)
+        if len(rows) >= self.max_batch_rows:
+            # Already a full batch on its own: no point waiting for company
+            model = self.get_model()
+            check_rows(model, rows)
+            self.stats.record(1, len(rows))
+            return predict_batch(model, rows)
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((rows, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        # Started lazily (and again after a fork) so preloaded gunicorn workers each get one
+        if self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._worker.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n_rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch, n_rows
+
+    def _run(self):
+        while True:
+            batch, _ = self._collect()
+            model = self.get_model()
+            # One bad request must not fail the others sharing its window: check each on its own
+            # before merging, and if the merged call still fails, score each request separately
+            valid = []
+            for rows, future in batch:
+                try:
+                    check_rows(model, rows)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    valid.append((rows, future))
+            if not valid:
+                continue
+            combined = [row for rows, _ in valid for row in rows]
+            try:
+                predictions = predict_batch(model, combined)
+            except Exception:
+                for rows, future in valid:
+                    try:
+                        future.set_result(predict_batch(model, rows))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            self.stats.record(len(valid), len(combined))
+            start = 0
+            for rows, future in valid:
+                end = start + len(rows)
+                future.set_result(predictions[start:end])
+                start = end
+
+
+def batcher_from_env(get_model):
+    if os.environ.get('PREDICT_MICRO_BATCHING', '0') != '1':
+        return None
+    return MicroBatcher(
+        get_model,
+        max_wait_ms=float(os.environ.get('PREDICT_BATCH_MAX_WAIT_MS', 2.0)),
+        max_batch_rows=int(os.environ.get('PREDICT_BATCH_MAX_ROWS', 256)),
+    )
@@ -0,0 +1,175 @@
+# Requests per second and latency of /evaluate and /predict under concurrent clients, served by
+# gunicorn + Flask (sync workers) and by gunicorn + uvicorn workers running the ASGI app.
+# The energy API is replaced by a local endpoint with a fixed delay, so the numbers show how each
+# server overlaps that upstream wait rather than the real API's rate limits. Server CPU time per
+# request (Linux only) is reported next to req/s: when the load generator shares the machine's
+# cores, req/s for cheap endpoints like /predict mostly measures the client.
+#   python benchmarks/server_throughput.py --workers 2 --concurrency 64 --seconds 10 --energy-delay-ms 50
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS = {
+    'flask': ('sync', 'wsgi:app'),
+    'asgi': ('uvicorn.workers.UvicornWorker', 'asgi:app'),
+}
+EVALUATE_BODY = {
+    'application': 'satellite',
+    'components': [
+        {'name': f'sensor-{i}', 'type': 'optical_sensors', 'consumption': 50.0 + i, 'lifespan': 10}
+        for i in range(10)
+    ],
+}
+# Legacy rows: three features and a trailing label, which prepare_data drops
+PREDICT_BODY = [[0.5, 1.5, 2.5, 0] for _ in range(32)]
+
+
+def serve_energy(port, delay):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps({'renewablePercentage': 62, 'fossilFreePercentage': 70}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(name, port, workers, energy_url, workdir):
+    worker_class, target = SERVERS[name]
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), WORKER_CLASS=worker_class,
+               ENERGY_API_URL=energy_url, MODEL_WATCH_INTERVAL='0', PYTHONPATH=BACKEND_DIR)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'), target],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def server_cpu_seconds(pid):
+    # User + system time of the gunicorn master and its workers, or None without /proc
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids = [pid] + [int(child) for child in f.read().split()]
+        total = 0
+        for process in pids:
+            with open(f'/proc/{process}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+    except (OSError, ValueError):
+        return None
+    return total / os.sysconf('SC_CLK_TCK')
+
+
+def wait_until_ready(base_url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'{base_url}/models', timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'server at {base_url} did not start')
+
+
+async def load(base_url, path, body, concurrency, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def client_loop():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+        'errors': errors,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare gunicorn/Flask with the ASGI app under uvicorn workers')
+    parser.add_argument('--servers', default=','.join(SERVERS))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--energy-delay-ms', type=float, default=50.0)
+    parser.add_argument('--serve-energy', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_energy:
+        serve_energy(args.serve_energy, args.energy_delay_ms / 1000.0)
+        sys.exit(0)
+
+    energy_port = free_port()
+    energy = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve-energy', str(energy_port),
+                               '--energy-delay-ms', str(args.energy_delay_ms)])
+    energy_url = f'http://127.0.0.1:{energy_port}/v3/power-breakdown/latest'
+    try:
+        for name in args.servers.split(','):
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            with tempfile.TemporaryDirectory() as workdir:
+                server = start_server(name, port, args.workers, energy_url, workdir)
+                try:
+                    wait_until_ready(base_url)
+                    for path, body in (('/evaluate', EVALUATE_BODY), ('/predict', PREDICT_BODY)):
+                        cpu_before = server_cpu_seconds(server.pid)
+                        result = asyncio.run(load(base_url, path, body, args.concurrency, args.seconds))
+                        cpu_after = server_cpu_seconds(server.pid)
+                        served = result['requests_per_second'] * args.seconds
+                        cpu = ''
+                        if cpu_before is not None and cpu_after is not None and served:
+                            cpu = f"  server cpu {(cpu_after - cpu_before) / served * 1e6:7.0f} us/req"
+                        print(f"{name:>6} {path:<10} {result['requests_per_second']:9.1f} req/s  "
+                              f"p50 {result['p50_ms'] or 0:8.1f} ms  p99 {result['p99_ms'] or 0:8.1f} ms  "
+                              f"{result['errors']} errors{cpu}")
+                finally:
+                    server.terminate()
+                    server.wait()
+    finally:
+        energy.terminate()
+        energy.wait()
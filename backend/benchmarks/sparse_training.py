@@ -0,0 +1,51 @@
+# Training time on sparse rows as the number of features grows. With l2 and momentum at 0 the cost
+# of train_model and partial_fit should follow the non-zeros, not the dimensionality; with either
+# set, train_model moves every weight on every step. train_model times include drawing the d initial
+# weights once.
+#   python benchmarks/sparse_training.py --rows 2000 --nonzeros 5 --batch-size 32 --dims 1000,100000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import LogisticRegressionModel, csr_rows
+from train import train_model
+
+
+def make_csr(n_rows, n_features, nonzeros, rng):
+    indptr, indices, values = [0], [], []
+    for _ in range(n_rows):
+        indices += sorted(rng.sample(range(n_features), nonzeros))
+        values += [rng.uniform(-1, 1) for _ in range(nonzeros)]
+        indptr.append(len(indices))
+    return indptr, indices, values
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sparse training cost against dimensionality')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--nonzeros', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--dims', default='1000,10000,100000')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for n_features in map(int, args.dims.split(',')):
+        X = csr_rows(*make_csr(args.rows, n_features, args.nonzeros, rng))
+        y = [float(rng.random() < 0.5) for _ in X]
+        plain = timed(lambda: train_model(X, y, n_features, num_epochs=1, batch_size=args.batch_size, callback=None))
+        regularized = timed(lambda: train_model(X, y, n_features, num_epochs=1, batch_size=args.batch_size,
+                                                l2=0.001, callback=None))
+        model = LogisticRegressionModel(n_features)
+        partial = timed(lambda: model.partial_fit(X, y, batch_size=args.batch_size))
+        print(f"d={n_features:>7}  train_model {plain:7.3f} s  with l2 {regularized:7.3f} s  "
+              f"partial_fit {partial:7.3f} s")
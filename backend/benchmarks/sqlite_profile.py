@@ -0,0 +1,86 @@
+# Concurrent read/write throughput of the SQLite engine under each database profile.
+#   python benchmarks/sqlite_profile.py --readers 8 --writers 2 --seconds 5
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from database import ENGINE_PROFILES, create_profiled_engine
+
+SEED_ROWS = 10000
+
+
+def _setup(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE samples (id INTEGER PRIMARY KEY, user_id INTEGER, score REAL)"))
+        conn.execute(text("CREATE INDEX ix_samples_user ON samples (user_id)"))
+        conn.execute(text("INSERT INTO samples (user_id, score) VALUES (:user_id, :score)"),
+                     [{"user_id": i % 100, "score": i / SEED_ROWS} for i in range(SEED_ROWS)])
+
+
+def _reader(engine, stop, counts, index):
+    n = 0
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT COUNT(*), AVG(score) FROM samples WHERE user_id = :u"),
+                             {"u": n % 100}).one()
+            n += 1
+        except OperationalError:
+            counts["errors"] += 1
+    counts["reads"][index] = n
+
+
+def _writer(engine, stop, counts, index):
+    n = 0
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO samples (user_id, score) VALUES (:u, :s)"), {"u": n % 100, "s": 0.5})
+            n += 1
+        except OperationalError:
+            counts["errors"] += 1
+    counts["writes"][index] = n
+
+
+def run(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_profiled_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile)
+        _setup(engine)
+        stop = threading.Event()
+        counts = {"reads": [0] * readers, "writes": [0] * writers, "errors": 0}
+        threads = ([threading.Thread(target=_reader, args=(engine, stop, counts, i)) for i in range(readers)]
+                   + [threading.Thread(target=_writer, args=(engine, stop, counts, i)) for i in range(writers)])
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+    return {
+        "profile": profile,
+        "reads_per_second": sum(counts["reads"]) / seconds,
+        "writes_per_second": sum(counts["writes"]) / seconds,
+        "lock_errors": counts["errors"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SQLite engine profiles under concurrent load")
+    parser.add_argument("--profiles", default=",".join(ENGINE_PROFILES))
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for profile in args.profiles.split(","):
+        result = run(profile, args.readers, args.writers, args.seconds)
+        print(f"{result['profile']:>12}: {result['reads_per_second']:10.0f} reads/s "
+              f"{result['writes_per_second']:8.0f} writes/s {result['lock_errors']:6d} lock errors")
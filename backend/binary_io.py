@@ -0,0 +1,120 @@
+import ast
+import struct
+import sys
+from array import array
+from data_preparation import row_views
+
+# Raw matrix: 16-byte header (magic, version, dtype code, rows, cols) followed by
+# rows * cols little-endian floats in row-major order
+MATRIX_MIMETYPE = 'application/x-ctdt-matrix'
+NPY_MIMETYPE = 'application/x-npy'
+MATRIX_MAGIC = b'CTDM'
+MATRIX_VERSION = 1
+MATRIX_HEADER = struct.Struct('<4sBcxxII')
+
+NPY_MAGIC = b'\x93NUMPY'
+NPY_DESCR = {'<f4': 'f', '<f8': 'd'}
+NPY_DESCR_BY_CODE = {code: descr for descr, code in NPY_DESCR.items()}
+
+BINARY_MIMETYPES = (MATRIX_MIMETYPE, NPY_MIMETYPE)
+
+
+class BinaryFormatError(ValueError):
+    pass
+
+
+def _float_view(body, offset, typecode, count):
+    itemsize = 4 if typecode == 'f' else 8
+    payload = memoryview(body)[offset:]
+    if len(payload) != count * itemsize:
+        raise BinaryFormatError(f'expected {count * itemsize} payload bytes, got {len(payload)}')
+    if sys.byteorder == 'little':
+        # No parsing and no copy: the rows are read straight out of the request body
+        return payload.cast(typecode)
+    values = array(typecode, payload.tobytes())
+    values.byteswap()
+    return values
+
+
+def _decode_matrix(body):
+    if len(body) < MATRIX_HEADER.size:
+        raise BinaryFormatError('body too small for a matrix header')
+    magic, version, dtype, n_rows, n_cols = MATRIX_HEADER.unpack_from(body, 0)
+    if magic != MATRIX_MAGIC or version != MATRIX_VERSION:
+        raise BinaryFormatError('not a CTDT matrix (bad magic or version)')
+    typecode = dtype.decode('ascii', 'replace')
+    if typecode not in ('f', 'd'):
+        raise BinaryFormatError(f"unsupported dtype {typecode!r}, expected 'f' or 'd'")
+    return _float_view(body, MATRIX_HEADER.size, typecode, n_rows * n_cols), n_rows, n_cols, typecode
+
+
+def _decode_npy(body):
+    if body[:6] != NPY_MAGIC or len(body) < 10:
+        raise BinaryFormatError('not an .npy payload')
+    major = body[6]
+    if major == 1:
+        header_len, = struct.unpack_from('<H', body, 8)
+        offset = 10
+    elif major in (2, 3):
+        header_len, = struct.unpack_from('<I', body, 8)
+        offset = 12
+    else:
+        raise BinaryFormatError(f'unsupported .npy version {major}')
+    try:
+        header = ast.literal_eval(bytes(body[offset:offset + header_len]).decode('latin1'))
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise BinaryFormatError('malformed .npy header') from None
+    if not isinstance(header, dict):
+        raise BinaryFormatError('malformed .npy header: expected a dict')
+    descr = header.get('descr')
+    typecode = NPY_DESCR.get(descr) if isinstance(descr, str) else None
+    if typecode is None:
+        raise BinaryFormatError(f"unsupported .npy dtype {descr!r}, expected '<f4' or '<f8'")
+    if header.get('fortran_order'):
+        raise BinaryFormatError('.npy arrays must be C-ordered')
+    shape = header.get('shape')
+    if not isinstance(shape, tuple) or not all(type(n) is int and n >= 0 for n in shape):
+        raise BinaryFormatError(f'malformed .npy header: shape must be a tuple of sizes, got {shape!r}')
+    if len(shape) == 1:
+        shape = (1, shape[0])
+    if len(shape) != 2:
+        raise BinaryFormatError(f'.npy arrays must be 1- or 2-dimensional, got shape {shape}')
+    n_rows, n_cols = shape
+    return _float_view(body, offset + header_len, typecode, n_rows * n_cols), n_rows, n_cols, typecode
+
+
+def decode_rows(body, mimetype):
+    if mimetype == MATRIX_MIMETYPE:
+        values, n_rows, n_cols, typecode = _decode_matrix(body)
+    elif mimetype == NPY_MIMETYPE:
+        values, n_rows, n_cols, typecode = _decode_npy(body)
+    else:
+        raise BinaryFormatError(f'unsupported content type {mimetype!r}')
+    if n_cols == 0:
+        if n_rows:
+            raise BinaryFormatError(f'{n_rows} rows with no columns')
+        return [], n_cols, typecode
+    return row_views(values, n_cols), n_cols, typecode
+
+
+def encode_matrix(values, n_cols, mimetype, typecode='d'):
+    # values is the flat row-major payload
+    payload = array(typecode, values)
+    if sys.byteorder != 'little':
+        payload.byteswap()
+    n_rows = len(payload) // n_cols if n_cols else 0
+    if mimetype == MATRIX_MIMETYPE:
+        header = MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, typecode.encode('ascii'), n_rows, n_cols)
+        return header + payload.tobytes()
+    if mimetype == NPY_MIMETYPE:
+        shape = f'({n_rows},)' if n_cols == 1 else f'({n_rows}, {n_cols})'
+        descr = f"{{'descr': '{NPY_DESCR_BY_CODE[typecode]}', 'fortran_order': False, 'shape': {shape}, }}"
+        # Pad so magic + lengths + header end on a 64-byte boundary, as numpy does
+        header_len = 10 + len(descr) + 1
+        descr += ' ' * (-header_len % 64) + '\n'
+        return NPY_MAGIC + b'\x01\x00' + struct.pack('<H', len(descr)) + descr.encode('latin1') + payload.tobytes()
+    raise BinaryFormatError(f'unsupported content type {mimetype!r}')
+
+
+def encode_column(values, mimetype, typecode='d'):
+    return encode_matrix(values, 1, mimetype, typecode)
@@ -1,4 +1,87 @@
-def prepare_data(form_data):
+from array import array
+from operator import itemgetter
+
+
+class FeatureSchemaError(ValueError):
+    pass
+
+
+class FeatureSchema:
+    def __init__(self, features, label=None):
+        if not features:
+            raise FeatureSchemaError("a feature schema needs at least one feature column")
+        self.features = tuple(features)
+        self.label = label
+        self._get_features = self._compile(self.features)
+        self._get_all = self._compile(self.features + (label,)) if label is not None else self._get_features
+
+    @staticmethod
+    def _compile(keys):
+        # itemgetter returns a bare value for a single key, so always hand back a tuple
+        if len(keys) == 1:
+            key = keys[0]
+            return lambda row: (row[key],)
+        return itemgetter(*keys)
+
+    @property
+    def n_features(self):
+        return len(self.features)
+
+    def _values(self, row, index, want_label):
+        if isinstance(row, dict):
+            try:
+                return (self._get_all if want_label else self._get_features)(row)
+            except KeyError as e:
+                raise FeatureSchemaError(f"row {index}: missing column {e.args[0]!r}") from None
+        if isinstance(row, (list, tuple)):
+            # Positional rows follow the schema order, optionally followed by the label
+            k = self.n_features
+            allowed = (k + 1,) if want_label else (k, k + 1) if self.label is not None else (k,)
+            if len(row) not in allowed:
+                raise FeatureSchemaError(
+                    f"row {index}: expected {' or '.join(map(str, allowed))} values, got {len(row)}"
+                )
+            return row
+        raise FeatureSchemaError(f"row {index}: expected an object or a list, got {type(row).__name__}")
+
+    def extract(self, rows, with_label=True):
+        if isinstance(rows, dict):
+            rows = [rows]
+        elif not isinstance(rows, (list, tuple)):
+            raise FeatureSchemaError(f"expected a list of rows, got {type(rows).__name__}")
+        n_rows = len(rows)
+        k = self.n_features
+        want_label = with_label and self.label is not None
+        # One contiguous row-major float64 block, filled in place
+        X = array('d', bytes(8 * n_rows * k))
+        y = array('d', bytes(8 * n_rows)) if want_label else None
+
+        for i, row in enumerate(rows):
+            values = self._values(row, i, want_label)
+            try:
+                converted = array('d', values)
+            except TypeError:
+                try:
+                    converted = array('d', [float(v) for v in values])
+                except (TypeError, ValueError):
+                    raise FeatureSchemaError(f"row {i}: all columns must be numeric") from None
+            X[i * k:(i + 1) * k] = converted[:k]
+            if want_label:
+                y[i] = converted[k]
+        return X, y
+
+
+def row_views(X, n_features):
+    # Zero-copy per-row views over a flat feature block
+    view = memoryview(X)
+    return [view[start:start + n_features] for start in range(0, len(view), n_features)]
+
+
+def prepare_data(form_data, schema=None, with_label=True):
+    if schema is not None:
+        X, y = schema.extract(form_data, with_label=with_label)
+        return row_views(X, schema.n_features), y
+
     # Convert form data to a structured format without pandas
     if isinstance(form_data, dict):
         # If it's a dictionary, convert to list format
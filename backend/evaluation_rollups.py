@@ -0,0 +1,142 @@
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Evaluation, EvaluationRollup, RollupWatermark
+
+WATERMARK_NAME = 'evaluations'
+GROUP_BY_COLUMNS = ('day', 'application', 'user_id')
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+class AnalyticsQueryError(ValueError):
+    pass
+
+
+def _raw_keys():
+    # Raw evaluation columns as they are keyed in the rollup table
+    return {
+        'day': func.date(Evaluation.created_at),
+        'application': func.coalesce(Evaluation.application, ''),
+        'user_id': func.coalesce(Evaluation.user_id, 0),
+        'classification': func.coalesce(Evaluation.classification, ''),
+    }
+
+
+def _next_batch(conn):
+    # Locks the watermark row, so concurrent folds (on PostgreSQL) run one after the other
+    query = select(RollupWatermark.last_batch).where(RollupWatermark.name == WATERMARK_NAME).with_for_update()
+    last_batch = conn.execute(query).scalar()
+    if last_batch is None:
+        upsert = UPSERTS[conn.dialect.name]
+        conn.execute(upsert(RollupWatermark).values(name=WATERMARK_NAME, last_batch=0).on_conflict_do_nothing())
+        last_batch = conn.execute(query).scalar()
+    batch = last_batch + 1
+    conn.execute(update(RollupWatermark).where(RollupWatermark.name == WATERMARK_NAME).values(last_batch=batch))
+    return batch
+
+
+def fold_evaluations(conn):
+    # Adds every evaluation not folded yet to the rollups, in the caller's transaction. Rows are
+    # claimed by stamping them with this fold's batch number rather than by id range: ids from
+    # concurrent writers can commit out of order, and a row below a max(id) watermark would be
+    # skipped forever. Run right after a bulk insert it only touches the rows just written; on a
+    # fresh rollup table it backfills the whole history once.
+    batch = _next_batch(conn)
+    claimed = conn.execute(
+        update(Evaluation).where(Evaluation.rollup_batch.is_(None)).values(rollup_batch=batch)
+    ).rowcount
+    if not claimed:
+        return 0
+
+    keys = _raw_keys()
+    groups = conn.execute(
+        select(*(column.label(name) for name, column in keys.items()),
+               func.count().label('count'),
+               func.sum(Evaluation.final_score).label('score_sum'),
+               func.sum(Evaluation.total_energy_consumption).label('energy_sum'))
+        .where(Evaluation.rollup_batch == batch)
+        .group_by(*keys.values())
+    ).mappings().all()
+    rows = [dict(group, day=str(group['day']), score_sum=group['score_sum'] or 0.0,
+                 energy_sum=group['energy_sum'] or 0.0) for group in groups]
+
+    upsert = UPSERTS[conn.dialect.name]
+    statement = upsert(EvaluationRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=['day', 'application', 'user_id', 'classification'],
+        set_={
+            'count': EvaluationRollup.count + statement.excluded['count'],
+            'score_sum': EvaluationRollup.score_sum + statement.excluded.score_sum,
+            'energy_sum': EvaluationRollup.energy_sum + statement.excluded.energy_sum,
+        },
+    )
+    conn.execute(statement, rows)
+    return claimed
+
+
+def _filtered(query, day, application, user_id, filters):
+    if filters.get('from'):
+        query = query.where(day >= filters['from'])
+    if filters.get('to'):
+        query = query.where(day <= filters['to'])
+    if filters.get('application') is not None:
+        query = query.where(application == filters['application'])
+    if filters.get('user_id') is not None:
+        query = query.where(user_id == filters['user_id'])
+    return query
+
+
+def evaluation_analytics(conn, group_by=('day',), **filters):
+    # Average score, classification mix and energy totals per bucket. Sums come from the rollups
+    # (O(buckets)); only evaluations not folded yet are read from the raw table. Both halves run as
+    # one UNION ALL statement, so a concurrent fold cannot count a row twice.
+    if not group_by or any(name not in GROUP_BY_COLUMNS for name in group_by):
+        raise AnalyticsQueryError(f'group_by must be a subset of {", ".join(GROUP_BY_COLUMNS)}')
+    group_by = tuple(dict.fromkeys(group_by))
+
+    rollup_keys = {name: getattr(EvaluationRollup, name) for name in GROUP_BY_COLUMNS + ('classification',)}
+    rollup_query = _filtered(
+        select(*(rollup_keys[name].label(name) for name in group_by),
+               rollup_keys['classification'].label('classification'),
+               func.sum(EvaluationRollup.count).label('count'),
+               func.sum(EvaluationRollup.score_sum).label('score_sum'),
+               func.sum(EvaluationRollup.energy_sum).label('energy_sum')),
+        rollup_keys['day'], rollup_keys['application'], rollup_keys['user_id'], filters,
+    ).group_by(*(rollup_keys[name] for name in group_by), rollup_keys['classification'])
+
+    raw_keys = _raw_keys()
+    raw_query = _filtered(
+        select(*(raw_keys[name].label(name) for name in group_by),
+               raw_keys['classification'].label('classification'),
+               func.count().label('count'),
+               func.sum(Evaluation.final_score).label('score_sum'),
+               func.sum(Evaluation.total_energy_consumption).label('energy_sum'))
+        .where(Evaluation.rollup_batch.is_(None)),
+        raw_keys['day'], raw_keys['application'], raw_keys['user_id'], filters,
+    ).group_by(*(raw_keys[name] for name in group_by), raw_keys['classification'])
+
+    buckets = {}
+    for *key, classification, count, score_sum, energy_sum in conn.execute(union_all(rollup_query, raw_query)):
+        key = tuple(str(value) if name == 'day' else value for name, value in zip(group_by, key))
+        bucket = buckets.setdefault(key, {'evaluations': 0, 'score_sum': 0.0, 'energy_total': 0.0,
+                                          'classifications': {}})
+        bucket['evaluations'] += count
+        bucket['score_sum'] += score_sum or 0.0
+        bucket['energy_total'] += energy_sum or 0.0
+        bucket['classifications'][classification] = bucket['classifications'].get(classification, 0) + count
+
+    results = []
+    for key in sorted(buckets):
+        bucket = buckets[key]
+        entry = dict(zip(group_by, key))
+        if 'application' in entry:
+            entry['application'] = entry['application'] or None
+        if 'user_id' in entry:
+            entry['user_id'] = entry['user_id'] or None
+        entry.update(
+            evaluations=bucket['evaluations'],
+            average_score=bucket['score_sum'] / bucket['evaluations'],
+            energy_total=bucket['energy_total'],
+            classifications=bucket['classifications'],
+        )
+        results.append(entry)
+    return {'group_by': list(group_by), 'buckets': results}
@@ -0,0 +1,157 @@
+import base64
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import insert, select, tuple_
+from models import Evaluation
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+WRITE_RETRIES = 3
+
+
+class EvaluationWriter:
+    # Evaluations are queued by the request and inserted by a background thread, many rows per
+    # executemany/transaction: a flush happens every flush_rows rows or flush_ms after the first
+    # queued row, whichever comes first. The queue is bounded, so a stalled database pushes back
+    # on requests instead of growing memory. Each hook(conn) runs inside the flush transaction.
+    def __init__(self, engine, flush_rows=500, flush_ms=200.0, max_pending=10000, hooks=()):
+        self.engine = engine
+        self.hooks = tuple(hooks)
+        self.flush_rows = flush_rows
+        self.flush_wait = flush_ms / 1000.0
+        self.max_pending = max_pending
+        self.written = 0
+        self.flushes = 0
+        self.failed = 0
+        self._queue = queue.Queue(max_pending)
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, **row):
+        row.setdefault('created_at', datetime.utcnow())
+        self._ensure_worker()
+        self._queue.put(row)
+
+    def _ensure_worker(self):
+        # Started lazily (and again after a fork) so preloaded gunicorn workers each get one
+        if self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._worker.is_alive():
+                return
+            self._queue = queue.Queue(self.max_pending)
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_wait
+        while len(batch) < self.flush_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conn, rows):
+        conn.execute(insert(Evaluation), rows)
+        for hook in self.hooks:
+            hook(conn)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            for attempt in range(WRITE_RETRIES):
+                try:
+                    with self.engine.begin() as conn:
+                        self._write(conn, batch)
+                except Exception as e:
+                    print(f"Evaluation flush of {len(batch)} rows failed (attempt {attempt + 1}): {e}")
+                    time.sleep(0.1 * 2 ** attempt)
+                    continue
+                self.written += len(batch)
+                self.flushes += 1
+                break
+            else:
+                self.failed += len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        # Blocks until everything queued so far has been written (or given up on)
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def stats(self):
+        return {
+            'pending': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'written': self.written,
+            'flushes': self.flushes,
+            'failed': self.failed,
+            'flush_rows': self.flush_rows,
+            'flush_ms': self.flush_wait * 1000.0,
+        }
+
+
+def writer_from_env(engine, hooks=()):
+    return EvaluationWriter(
+        engine,
+        hooks=hooks,
+        flush_rows=int(os.environ.get('EVALUATION_FLUSH_ROWS', 500)),
+        flush_ms=float(os.environ.get('EVALUATION_FLUSH_MS', 200.0)),
+        max_pending=int(os.environ.get('EVALUATION_MAX_PENDING', 10000)),
+    )
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at, evaluation_id):
+    raw = f'{created_at.isoformat()}|{evaluation_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, evaluation_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(evaluation_id)
+    except ValueError:
+        raise InvalidCursorError('invalid history cursor') from None
+
+
+# The fields of a history item; internal bookkeeping such as rollup_batch stays out of the API
+HISTORY_COLUMNS = (
+    Evaluation.id, Evaluation.user_id, Evaluation.twin_id, Evaluation.application, Evaluation.final_score,
+    Evaluation.classification, Evaluation.total_energy_consumption, Evaluation.component_count,
+    Evaluation.detailed_scores, Evaluation.created_at,
+)
+
+
+def fetch_history(conn, user_id, twin_id=None, limit=HISTORY_PAGE_SIZE, cursor=None):
+    # Keyset pagination, newest first: each page seeks straight to (created_at, id) < cursor on the
+    # (user_id[, twin_id], created_at, id) index, so page 10,000 costs the same as page 1
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    query = select(*HISTORY_COLUMNS).where(Evaluation.user_id == user_id)
+    if twin_id is not None:
+        query = query.where(Evaluation.twin_id == twin_id)
+    if cursor is not None:
+        query = query.where(tuple_(Evaluation.created_at, Evaluation.id) < tuple_(*decode_cursor(cursor)))
+    query = query.order_by(Evaluation.created_at.desc(), Evaluation.id.desc()).limit(limit + 1)
+    rows = conn.execute(query).mappings().all()
+
+    items = [dict(row, created_at=row['created_at'].isoformat()) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last['created_at'], last['id'])
+    return {'items': items, 'next_cursor': next_cursor}
@@ -0,0 +1,30 @@
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# "uvicorn.workers.UvicornWorker" to serve asgi:app
+worker_class = os.environ.get('WORKER_CLASS', 'sync')
+# More than one thread turns sync workers into gthread workers that serve requests concurrently
+threads = int(os.environ.get('WEB_THREADS', '1'))
+
+# Import the app (and load the model artifact) once in the master, so forked workers
+# share the mapped model pages instead of each loading their own copy
+preload_app = True
+
+
+def on_starting(server):
+    # A sync worker serves one request at a time, so the micro-batcher would only add its wait
+    # window without ever combining two requests
+    if os.environ.get('PREDICT_MICRO_BATCHING', '0') == '1' and worker_class == 'sync' and threads <= 1:
+        server.log.warning("PREDICT_MICRO_BATCHING=1 has no effect with single-threaded sync workers; "
+                           "set WEB_THREADS > 1 or WORKER_CLASS=uvicorn.workers.UvicornWorker")
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork, so each worker starts its own artifact watcher
+    from main import model_holder, MODEL_WATCH_INTERVAL
+    from database import engine
+    # Pooled SQLite connections opened in the master must not be shared with the children
+    engine.dispose(close=False)
+    if MODEL_WATCH_INTERVAL > 0:
+        model_holder.watch(MODEL_WATCH_INTERVAL)
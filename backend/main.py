@@ -1,70 +1,525 @@
-from flask import Flask, request, jsonify
+import os
+import hmac
+import math
+import atexit
+from datetime import datetime
+from functools import wraps
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from utils import get_energy_data_for_portugal
 from models.component import Component, DigitalTwin
 from evaluator.ecological_evaluator import EcologicalEvaluator
-from train import train_model
-from predict import predict
-from model import LogisticRegressionModel
-from data_preparation import prepare_data
+from training_jobs import TrainingJobManager, UnknownJobError
+from predict import InvalidRowsError, check_rows, predict_batch
+from batching import batcher_from_env
+from binary_io import BINARY_MIMETYPES, BinaryFormatError, decode_rows, encode_column, encode_matrix
+from metrics import evaluate_in_chunks
+from model import MultinomialLogisticModel
+from model_holder import ModelHolder
+from model_registry import ModelRegistry, UnavailableModelError, UnknownModelError
+from data_preparation import prepare_data, FeatureSchemaError
+from jose import JWTError
+from sqlalchemy import select
+from database import engine
+from models import Base, User
+from evaluation_store import HISTORY_PAGE_SIZE, InvalidCursorError, fetch_history, writer_from_env
+from evaluation_rollups import AnalyticsQueryError, evaluation_analytics, fold_evaluations
+from revocation import revocation_list
+from tokens import bearer_token, decode_access_token
+from rate_limit import limiter_from_env, retry_after_header
+from token_cache import token_cache
+from user_import import ImportJobManager, UnknownImportError
 
 app = Flask(__name__)
 CORS(app)
 
-model = LogisticRegressionModel(input_size=3) 
+MODEL_INPUT_SIZE = 3
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model.bin'))
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 2.0))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Loaded once at import; with gunicorn's preload_app the mapped weights are shared by all workers
+model_holder = ModelHolder(MODEL_PATH, MODEL_INPUT_SIZE)
+model_holder.load_initial()
+
+# Per-domain models (?model=satellite&version=2), loaded lazily and kept LRU-resident
+model_registry = ModelRegistry(
+    os.environ.get('MODEL_REGISTRY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts')),
+    capacity=int(os.environ.get('MODEL_REGISTRY_CAPACITY', 4)),
+    latest_ttl=float(os.environ.get('MODEL_REGISTRY_LATEST_TTL', 5.0)),
+)
+
+# Background training runs in a bounded process pool; job state is kept on disk
+training_jobs = TrainingJobManager(
+    os.environ.get('TRAINING_JOB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_jobs')),
+    max_workers=int(os.environ.get('TRAINING_MAX_WORKERS', 1)),
+)
+
+# Evaluation history is written in the background, in bulk (EVALUATION_FLUSH_ROWS / EVALUATION_FLUSH_MS)
+# and folded into the analytics rollups in the same transaction
+Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    fold_evaluations(conn)
+evaluation_writer = writer_from_env(engine, hooks=(fold_evaluations,))
+atexit.register(evaluation_writer.flush)
+# Revoked token ids are loaded now and re-synced by each worker every REVOCATION_SYNC_INTERVAL seconds
+revocation_list.sync()
+
+# Bulk user imports run as background jobs with USER_IMPORT_WORKERS hashing threads; larger files
+# go through `python user_import.py`
+USER_IMPORT_MAX_ROWS = int(os.environ.get('USER_IMPORT_MAX_ROWS', 10000))
+USER_IMPORT_WORKERS = int(os.environ.get('USER_IMPORT_WORKERS', os.cpu_count() or 1))
+user_imports = ImportJobManager(
+    os.environ.get('USER_IMPORT_JOB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_jobs')),
+    USER_IMPORT_WORKERS,
+    # A failed login may have cached "no such user" for an email that now exists
+    on_created=token_cache.invalidate_user,
+)
+
+# Optional token-bucket admission control for /evaluate and /predict (RATE_LIMIT=1)
+rate_limiter = limiter_from_env()
+# Behind a reverse proxy the client address is the first X-Forwarded-For entry
+TRUST_PROXY = os.environ.get('TRUST_PROXY', '0') == '1'
+
+# Optional micro-batching of concurrent /predict calls (PREDICT_MICRO_BATCHING=1)
+batcher = batcher_from_env(model_holder.get)
+
+def require_admin(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token')
+        if not ADMIN_TOKEN or not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def token_payload(authorization):
+    # The claims of a valid, unrevoked "Authorization: Bearer" header value, or None
+    token = bearer_token(authorization)
+    if token is None:
+        return None
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        return None
+    if revocation_list.is_revoked(payload.get('jti')):
+        return None
+    return payload
+
+def bearer_payload():
+    return token_payload(request.headers.get('Authorization'))
+
+def bearer_subject():
+    payload = bearer_payload()
+    return payload.get('sub') if payload else None
+
+def bearer_user_id():
+    email = bearer_subject()
+    if email is None:
+        return None
+    with engine.connect() as conn:
+        return conn.execute(select(User.id).where(User.email == email)).scalar()
+
+def client_address(forwarded_for, remote_addr):
+    forwarded = forwarded_for if TRUST_PROXY else None
+    return forwarded.split(',')[0].strip() if forwarded else remote_addr
+
+def client_ip():
+    return client_address(request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+def rate_limited(endpoint):
+    # A 429 response when the caller's bucket cannot cover this request, otherwise None. Runs
+    # before the body is read: the cost comes from Content-Length
+    if rate_limiter is None:
+        return None
+    retry_after = rate_limiter.check(endpoint, request.content_length, user=bearer_subject(), ip=client_ip())
+    if not retry_after:
+        return None
+    return (jsonify({'error': 'Too many requests', 'retry_after': retry_after}), 429,
+            {'Retry-After': retry_after_header(retry_after)})
+
+def record_evaluation(data, twin, score, classification, detailed_scores, resolve_user_id=bearer_user_id):
+    try:
+        twin_id = data.get('twin_id')
+        evaluation_writer.submit(
+            user_id=resolve_user_id(),
+            twin_id=str(twin_id) if twin_id is not None else None,
+            application=data.get('application'),
+            final_score=score,
+            classification=classification,
+            total_energy_consumption=twin.total_energy_consumption,
+            component_count=len(twin.components),
+            detailed_scores=detailed_scores,
+        )
+    except Exception as e:
+        # History is best effort: never fail the evaluation itself
+        print(f"Could not record evaluation: {e}")
+
+ENERGY_API_KEY = "pnu0oRE4gsIMK"
+
+def parse_components(components_data):
+    return [
+        Component(
+            name=comp['name'],
+            type=comp['type'],
+            energy_consumption=float(comp['consumption']),
+            lifespan_years=float(comp['lifespan'])
+        )
+        for comp in components_data
+    ]
+
+def evaluate_twin(components, energy_data):
+    # Shared by the Flask view and the ASGI app; energy_data is None when the fetch failed
+    renewable_percentage = energy_data['renewable_percentage'] if energy_data else 50.0
+
+    twin = DigitalTwin(
+        components=components,
+        is_reusable=True,
+        energy_source_renewable_percentage=renewable_percentage,
+        total_energy_consumption=sum(c.energy_consumption for c in components),
+        waste_generated=sum(c.energy_consumption * 0.02 for c in components)  
+    )
+
+    evaluator = EcologicalEvaluator()
+    score, classification, detailed_scores = evaluator.evaluate(twin)
+    return twin, score, classification, detailed_scores
+
+def evaluation_response(score, classification, detailed_scores):
+    return {
+        'final_score': round(score, 2),
+        'classification': classification,
+        'detailed_scores': {k: round(v, 2) for k, v in detailed_scores.items()}
+    }
 
 @app.route('/evaluate', methods=['POST'])
 def evaluate_digital_twin():
+    limited = rate_limited('evaluate')
+    if limited:
+        return limited
     try:
         data = request.json
-        application = data.get('application')
         components_data = data.get('components', [])
+        components = parse_components(components_data)
+        energy_data = get_energy_data_for_portugal(ENERGY_API_KEY)
+        twin, score, classification, detailed_scores = evaluate_twin(components, energy_data)
+        record_evaluation(data, twin, score, classification, detailed_scores)
 
-        components = [
-            Component(
-                name=comp['name'],
-                type=comp['type'],
-                energy_consumption=float(comp['consumption']),
-                lifespan_years=float(comp['lifespan'])
-            )
-            for comp in components_data
-        ]
-
-        api_key = "pnu0oRE4gsIMK"
-        energy_data = get_energy_data_for_portugal(api_key)
-        renewable_percentage = energy_data['renewable_percentage'] if energy_data else 50.0
-
-        twin = DigitalTwin(
-            components=components,
-            is_reusable=True,
-            energy_source_renewable_percentage=renewable_percentage,
-            total_energy_consumption=sum(c.energy_consumption for c in components),
-            waste_generated=sum(c.energy_consumption * 0.02 for c in components)  
-        )
+        return jsonify(evaluation_response(score, classification, detailed_scores))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
 
-        evaluator = EcologicalEvaluator()
-        score, classification, detailed_scores = evaluator.evaluate(twin)
+@app.route('/auth/revoke', methods=['POST'])
+def revoke_token():
+    # Logs out the presented token everywhere within REVOCATION_SYNC_INTERVAL
+    payload = bearer_payload()
+    if payload is None or 'exp' not in payload:
+        return jsonify({'error': 'Could not validate credentials'}), 401, {'WWW-Authenticate': 'Bearer'}
+    if payload.get('jti') is None:
+        return jsonify({'error': 'token has no jti and cannot be revoked'}), 400
+    revocation_list.revoke(payload['jti'], datetime.utcfromtimestamp(payload['exp']))
+    return jsonify({'revoked': payload['jti']})
 
-        return jsonify({
-            'final_score': round(score, 2),
-            'classification': classification,
-            'detailed_scores': {k: round(v, 2) for k, v in detailed_scores.items()}
-        })
+@app.route('/evaluations', methods=['GET'])
+def evaluation_history():
+    user_id = bearer_user_id()
+    if user_id is None:
+        return jsonify({'error': 'Could not validate credentials'}), 401, {'WWW-Authenticate': 'Bearer'}
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        with engine.connect() as conn:
+            page = fetch_history(conn, user_id, request.args.get('twin_id'), limit, request.args.get('cursor'))
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page)
 
-    except Exception as e:
+@app.route('/evaluations/analytics', methods=['GET'])
+@require_admin
+def evaluation_analytics_view():
+    try:
+        user_id = request.args.get('user_id')
+        with engine.connect() as conn:
+            report = evaluation_analytics(
+                conn,
+                group_by=request.args.get('group_by', 'day').split(','),
+                **{'from': request.args.get('from'), 'to': request.args.get('to')},
+                application=request.args.get('application'),
+                user_id=int(user_id) if user_id is not None else None,
+            )
+    except (AnalyticsQueryError, ValueError) as e:
         return jsonify({'error': str(e)}), 400
+    return jsonify(report)
+
+@app.route('/admin/users/import', methods=['POST'])
+@require_admin
+def bulk_import_users():
+    rows = request.json
+    if not isinstance(rows, list):
+        return jsonify({'error': 'expected a JSON list of {"email", "password", "name"} objects'}), 400
+    if len(rows) > USER_IMPORT_MAX_ROWS:
+        return jsonify({'error': f'at most {USER_IMPORT_MAX_ROWS} users per request, use user_import.py for more'}), 413
+    return jsonify(user_imports.submit(rows, engine)), 202
+
+@app.route('/admin/users/import/<job_id>', methods=['GET'])
+@require_admin
+def bulk_import_status(job_id):
+    try:
+        return jsonify(user_imports.status(job_id))
+    except UnknownImportError as e:
+        return jsonify({'error': str(e)}), 404
+
+class PredictRequestError(ValueError):
+    pass
+
+def prediction_rows(model, mimetype, body=None, data=None):
+    # X and its dtype, from a binary body or from already parsed JSON rows
+    if mimetype in BINARY_MIMETYPES:
+        X, n_cols, typecode = decode_rows(body, mimetype)
+        if X and n_cols != model.input_size:
+            raise PredictRequestError(f'expected {model.input_size} columns, got {n_cols}')
+        return X, typecode
+    if not isinstance(data, (list, dict)):
+        raise PredictRequestError('expected a JSON list of rows')
+    # Artifacts that name their columns are read by name instead of by dict order
+    X, _ = prepare_data(data, schema=model.feature_schema, with_label=False)
+    if model.feature_schema is None:
+        try:
+            check_rows(model, X)
+        except InvalidRowsError as e:
+            raise PredictRequestError(str(e)) from None
+    return X, 'd'
+
+def prediction_result(model, X, typecode, explain, response_type, batched):
+    # (payload, mimetype): a JSON-ready dict with mimetype None, or the encoded body for a binary
+    # response_type. Shared by the Flask view and the ASGI app.
+    if isinstance(model, MultinomialLogisticModel):
+        if explain:
+            raise PredictRequestError('explanations are only available for binary logistic models')
+        probabilities = model.predict_proba_batch(X)
+        if response_type in BINARY_MIMETYPES:
+            flat = [p for row in probabilities for p in row]
+            return encode_matrix(flat, len(model.classes), response_type, typecode), response_type
+        return {
+            'classes': model.classes,
+            'predictions': [model.classes[p.index(max(p))] for p in probabilities],
+            'probabilities': probabilities,
+        }, None
+
+    if explain:
+        predictions, logits, contributions = model.explain_batch(X)
+        return {
+            'predictions': predictions,
+            'logits': logits,
+            'intercept': model.bias,
+            'features': model.feature_names,
+            'contributions': [
+                {str(j): value for j, value in row.items()} if isinstance(row, dict) else row
+                for row in contributions
+            ],
+        }, None
+
+    if batched and batcher is not None:
+        try:
+            predictions = batcher.submit(X)
+        except InvalidRowsError as e:
+            raise PredictRequestError(str(e)) from None
+    else:
+        predictions = predict_batch(model, X)
+
+    if response_type in BINARY_MIMETYPES:
+        return encode_column(predictions, response_type, typecode), response_type
+    return {'predictions': predictions}, None
 
 @app.route('/predict', methods=['POST'])
 def make_prediction():
-    data = request.json
-    X, _ = prepare_data(data)  
-    predictions = []
-    for x in X:
-        pred = predict(model, x)
-        predictions.append(pred)
-    return jsonify({'predictions': predictions})
+    model_name = request.args.get('model')
+    try:
+        model = model_registry.get(model_name, request.args.get('version')) if model_name else model_holder.get()
+    except UnknownModelError as e:
+        return jsonify({'error': str(e)}), 404
+    except UnavailableModelError as e:
+        return jsonify({'error': str(e)}), 503
+
+    limited = rate_limited('predict')
+    if limited:
+        return limited
+    try:
+        if request.mimetype in BINARY_MIMETYPES:
+            X, typecode = prediction_rows(model, request.mimetype, body=request.get_data(cache=False))
+        else:
+            X, typecode = prediction_rows(model, request.mimetype, data=request.json)
+    except (FeatureSchemaError, BinaryFormatError, PredictRequestError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Answer in binary only when the client prefers it over JSON
+        payload, mimetype = prediction_result(model, X, typecode, request.args.get('explain') in ('1', 'true'),
+                                              request.accept_mimetypes.best, batched=not model_name)
+    except PredictRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    if mimetype is None:
+        return jsonify(payload)
+    return Response(payload, mimetype=mimetype)
+
+def labeled_rows(rows, model):
+    if isinstance(model, MultinomialLogisticModel):
+        raise ValueError('only binary logistic models can be trained or evaluated here')
+    schema = model.feature_schema
+    if schema is not None and schema.label is None:
+        raise FeatureSchemaError('the model does not name a label column')
+    try:
+        X, y = prepare_data(rows, schema=schema)
+    except IndexError:
+        raise ValueError('every row needs its features followed by a label') from None
+    if schema is None:
+        # The trainers and scorers zip rows against the weights, like the /predict scorers
+        check_rows(model, X)
+    y = [float(target) for target in y]
+    if not X:
+        raise ValueError('no rows to train on')
+    if any(target not in (0.0, 1.0) for target in y):
+        raise ValueError('labels must be 0 or 1')
+    # One NaN or infinity would turn every weight it touches into NaN
+    if not all(math.isfinite(value) for row in X for value in row):
+        raise ValueError('feature values must be finite numbers')
+    return X, y
+
+def positive_number(value, name):
+    value = float(value)
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f'{name} must be a finite number above 0')
+    return value
+
+def non_negative_number(value, name):
+    value = float(value)
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f'{name} must be a finite number of at least 0')
+    return value
+
+def positive_count(value, name):
+    value = int(value)
+    if value < 1:
+        raise ValueError(f'{name} must be at least 1')
+    return value
+
+# How each /train/jobs parameter is read from the request
+TRAINING_PARAMS = {
+    'num_epochs': positive_count,
+    'learning_rate': positive_number,
+    'l2': non_negative_number,
+    'standardize': lambda value, name: bool(value),
+    'checkpoint_every': lambda value, name: int(non_negative_number(value, name)),
+    # 0 keeps full-batch gradient descent
+    'batch_size': lambda value, name: positive_count(value, name) if value else None,
+    'momentum': non_negative_number,
+    'seed': lambda value, name: int(value),
+}
+
+@app.route('/train/increment', methods=['POST'])
+@require_admin
+def train_increment():
+    data = request.json or {}
+    try:
+        learning_rate = positive_number(data.get('learning_rate', 0.01), 'learning_rate')
+        epochs = positive_count(data.get('epochs', 1), 'epochs')
+        X, y = labeled_rows(data.get('rows', []), model_holder.get())
+    except (FeatureSchemaError, TypeError, ValueError, OverflowError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Saved to MODEL_PATH before answering; the other workers' watchers reload it
+    loss = model_holder.update_artifact(
+        lambda model: model.partial_fit(X, y, learning_rate=learning_rate, epochs=epochs))
+    return jsonify({'rows': len(X), 'loss': loss, 'model_version': model_holder.version})
+
+@app.route('/train/jobs', methods=['POST'])
+@require_admin
+def submit_training_job():
+    data = request.json or {}
+    model = model_holder.get()
+    try:
+        # Everything is checked here: a job that can only fail should not be queued. Parameters the
+        # request leaves out come from the checkpoint when resuming, otherwise from the defaults.
+        params = {
+            name: parse(data[name], name)
+            for name, parse in TRAINING_PARAMS.items() if data.get(name) is not None
+        }
+        if params.get('momentum', 0.0) >= 1:
+            raise ValueError('momentum must be below 1')
+        X, y = labeled_rows(data.get('rows', []), model)
+        validation = labeled_rows(data['validation_rows'], model) if data.get('validation_rows') else None
+        # warm_start begins from the served artifact instead of random weights
+        init_path = model_holder.path if data.get('warm_start') and os.path.exists(model_holder.path) else None
+        job_id = training_jobs.submit(X, y, model.input_size, params, model.feature_names, data.get('resume_from'),
+                                      validation, init_path)
+    except (FeatureSchemaError, TypeError, ValueError, OverflowError) as e:
+        return jsonify({'error': str(e)}), 400
+    except UnknownJobError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(training_jobs.status(job_id)), 202
+
+@app.route('/train/jobs/<job_id>', methods=['GET'])
+@require_admin
+def training_job_status(job_id):
+    try:
+        return jsonify(training_jobs.status(job_id))
+    except UnknownJobError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/train/jobs/<job_id>', methods=['DELETE'])
+@require_admin
+def cancel_training_job(job_id):
+    try:
+        return jsonify(training_jobs.cancel(job_id))
+    except UnknownJobError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/predict/evaluate', methods=['POST'])
+def evaluate_model():
+    model_name = request.args.get('model')
+    try:
+        model = model_registry.get(model_name, request.args.get('version')) if model_name else model_holder.get()
+    except UnknownModelError as e:
+        return jsonify({'error': str(e)}), 404
+    except UnavailableModelError as e:
+        return jsonify({'error': str(e)}), 503
+    try:
+        X, y = labeled_rows(request.json or [], model)
+    except (FeatureSchemaError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(evaluate_in_chunks(model, X, y).report())
+
+@app.route('/models', methods=['GET'])
+def registry_stats():
+    return jsonify(model_registry.stats())
+
+@app.route('/predict/batching', methods=['GET'])
+def batching_stats():
+    if batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({
+        'enabled': True,
+        'max_wait_ms': batcher.max_wait * 1000.0,
+        'max_batch_rows': batcher.max_batch_rows,
+        **batcher.stats.snapshot(),
+    })
+
+@app.route('/rate-limit', methods=['GET'])
+def rate_limit_stats():
+    if rate_limiter is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **rate_limiter.stats()})
+
+@app.route('/admin/reload-model', methods=['POST'])
+@require_admin
+def reload_model():
+    try:
+        model_holder.reload()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'model_version': model_holder.version, 'path': model_holder.path})
 
 if __name__ == '__main__':
-    import os
+    if MODEL_WATCH_INTERVAL > 0:
+        model_holder.watch(MODEL_WATCH_INTERVAL)
     port = int(os.environ.get('PORT', 5001))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,97 @@
+import math
+from array import array
+
+DEFAULT_THRESHOLDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+class StreamingMetrics:
+    # Binary classification quality over any number of chunks in O(n_bins) memory: predicted
+    # probabilities are counted into per-class histograms, from which the confusion matrices
+    # and the ROC curve are rebuilt at bin resolution
+    def __init__(self, n_bins=1000, threshold=0.5):
+        self.n_bins = n_bins
+        self.threshold = threshold
+        self.positives = array('q', bytes(8 * n_bins))
+        self.negatives = array('q', bytes(8 * n_bins))
+        self.count = 0
+        self.correct = 0
+        self.total_log_loss = 0.0
+
+    def update(self, y_true, probabilities):
+        n_bins = self.n_bins
+        threshold = self.threshold
+        positives = self.positives
+        negatives = self.negatives
+        log = math.log
+        for target, p in zip(y_true, probabilities):
+            b = min(int(p * n_bins), n_bins - 1)
+            if target >= 0.5:
+                positives[b] += 1
+                self.total_log_loss -= log(p + 1e-8)
+                self.correct += p >= threshold
+            else:
+                negatives[b] += 1
+                self.total_log_loss -= log(1 - p + 1e-8)
+                self.correct += p < threshold
+            self.count += 1
+        return self
+
+    def merge(self, other):
+        if other.n_bins != self.n_bins:
+            raise ValueError("cannot merge metrics with different bin counts")
+        for b in range(self.n_bins):
+            self.positives[b] += other.positives[b]
+            self.negatives[b] += other.negatives[b]
+        self.count += other.count
+        self.correct += other.correct
+        self.total_log_loss += other.total_log_loss
+        return self
+
+    @property
+    def log_loss(self):
+        return self.total_log_loss / self.count if self.count else 0.0
+
+    @property
+    def accuracy(self):
+        return self.correct / self.count if self.count else 0.0
+
+    def confusion_matrix(self, threshold):
+        # Rows at or above the bin containing the threshold count as predicted positive
+        start = min(math.ceil(threshold * self.n_bins), self.n_bins)
+        tp = sum(self.positives[start:])
+        fp = sum(self.negatives[start:])
+        total_positives = sum(self.positives)
+        total_negatives = sum(self.negatives)
+        return {'threshold': threshold, 'tp': tp, 'fp': fp,
+                'fn': total_positives - tp, 'tn': total_negatives - fp}
+
+    def auc(self):
+        # Trapezoidal area under the ROC curve, sweeping the threshold down one bin at a time
+        total_positives = sum(self.positives)
+        total_negatives = sum(self.negatives)
+        if not total_positives or not total_negatives:
+            return None
+        area = 0.0
+        tp = fp = 0
+        for b in range(self.n_bins - 1, -1, -1):
+            new_tp = tp + self.positives[b]
+            new_fp = fp + self.negatives[b]
+            area += (new_fp - fp) * (tp + new_tp) / 2
+            tp, fp = new_tp, new_fp
+        return area / (total_positives * total_negatives)
+
+    def report(self, thresholds=DEFAULT_THRESHOLDS):
+        return {
+            'rows': self.count,
+            'log_loss': self.log_loss,
+            'accuracy': self.accuracy,
+            'auc': self.auc(),
+            'confusion_matrices': [self.confusion_matrix(t) for t in thresholds],
+        }
+
+
+def evaluate_in_chunks(model, X, y, chunk_size=10000, metrics=None):
+    metrics = metrics or StreamingMetrics()
+    for start in range(0, len(X), chunk_size):
+        metrics.update(y[start:start + chunk_size], model.predict_batch(X[start:start + chunk_size]))
+    return metrics
@@ -1,21 +1,258 @@
+import copy
 import random
 import math
+import operator
+from array import array
+
+class SparseRow:
+    # CSR-style row: only the non-zero feature positions and their values
+    __slots__ = ('indices', 'values')
+
+    def __init__(self, indices, values):
+        self.indices = array('q', indices)
+        self.values = array('d', values)
+        if len(self.indices) != len(self.values):
+            raise ValueError(f"sparse row has {len(self.indices)} indices but {len(self.values)} values")
+        if self.indices and min(self.indices) < 0:
+            raise ValueError("sparse row indices must be non-negative")
+
+    def dot(self, weights):
+        return sum(map(operator.mul, map(weights.__getitem__, self.indices), self.values))
+
+    def add_scaled_to(self, target, scale):
+        for j, value in zip(self.indices, self.values):
+            target[j] += scale * value
+
+
+def csr_rows(indptr, indices, values):
+    return [SparseRow(indices[start:end], values[start:end]) for start, end in zip(indptr, indptr[1:])]
+
+
+def check_sparse_rows(X, input_size):
+    # A dense row among sparse ones, or an index past the weights, fails mid-training otherwise
+    for i, x in enumerate(X):
+        if x.__class__ is not SparseRow:
+            raise ValueError(f"row {i} is dense; sparse and dense rows cannot be mixed")
+        if x.indices and max(x.indices) >= input_size:
+            raise ValueError(f"row {i} has a feature index past the input size {input_size}")
+
+
+def add_scaled(target, x, scale):
+    # target += scale * x for a dense or sparse row; sparse rows only touch their non-zeros
+    if x.__class__ is SparseRow:
+        x.add_scaled_to(target, scale)
+    else:
+        for j, value in enumerate(x):
+            target[j] += scale * value
+
+
+class LinearModel:
+    # Shared by the binary and multinomial models: flat float64 weights (possibly a read-only
+    # memoryview over a mapped artifact) and an optional standardizer folded in at serving time
+    def __init__(self, input_size, weights, feature_names=None, standardizer=None):
+        self.input_size = input_size
+        self.weights = weights
+        self.feature_names = list(feature_names or [])
+        # Weights live in standardized feature space when a standardizer is attached
+        self.standardizer = standardizer
+        # Set when loaded from an artifact
+        self.schema = {}
+        self.feature_schema = None
+
+    def copy(self):
+        # Own, writable weights and bias; the standardizer, schema and names are shared
+        clone = copy.copy(self)
+        clone.weights = array('d', self.weights)
+        if isinstance(self.bias, array):
+            clone.bias = array('d', self.bias)
+        clone.clear_serving_cache()
+        return clone
+
+    @property
+    def standardizer(self):
+        return self._standardizer
+
+    @standardizer.setter
+    def standardizer(self, standardizer):
+        self._standardizer = standardizer
+        self._serving = None
+
+    def clear_serving_cache(self):
+        # Call after changing weights or bias in place
+        self._serving = None
+
+    def dot_product(self, a, b):
+        if a.__class__ is SparseRow:
+            return a.dot(b)
+        return sum(map(operator.mul, a, b))
+
+
+class LogisticRegressionModel(LinearModel):
+    def __init__(self, input_size, weights=None, bias=0.0, feature_names=None, standardizer=None):
+        if weights is None:
+            weights = array('d', (random.gauss(0, 0.01) for _ in range(input_size)))
+        self.bias = bias
+        super().__init__(input_size, weights, feature_names, standardizer)
+
+    def serving_parameters(self):
+        # Weights and bias that apply to raw features, with standardization folded in
+        if self._standardizer is None:
+            return self.weights, self.bias
+        if self._serving is None:
+            self._serving = self._standardizer.fold(self.weights, self.bias)
+        return self._serving
 
-class LogisticRegressionModel:
-    def __init__(self, input_size):
-        self.weights = [[random.gauss(0, 0.01)] for _ in range(input_size)]
-        self.bias = 0.0
-        
     def sigmoid(self, x):
         # Clip x to prevent overflow
         x = max(-250, min(250, x))
         return 1 / (1 + math.exp(-x))
-        
-    def dot_product(self, a, b):
-        return sum(a[i] * b[i][0] for i in range(len(a)))
-        
+
     def predict(self, x):
-        if not isinstance(x, list):
+        if not isinstance(x, (list, SparseRow)):
             x = list(x)
-        z = self.dot_product(x, self.weights) + self.bias
-        return self.sigmoid(z)  
+        weights, bias = self.serving_parameters()
+        z = self.dot_product(x, weights) + bias
+        return self.sigmoid(z)
+
+    def predict_batch(self, X):
+        # Bind everything once so the per-row cost is a single C-level dot product
+        weights, bias = self.serving_parameters()
+        sigmoid = self.sigmoid
+        mul = operator.mul
+        return [
+            sigmoid((x.dot(weights) if x.__class__ is SparseRow else sum(map(mul, x, weights))) + bias)
+            for x in X
+        ]
+
+    def explain_batch(self, X):
+        # Per-feature contributions w_j * standardized x_j, their sum plus the bias (the logit) and the
+        # probability, all in the same pass. With standardization each contribution is x_j * (w_j / s_j) -
+        # m_j * w_j / s_j, so no standardized copy of the row is built. A standardized sparse row is dense
+        # (absent features contribute -m_j * w_j / s_j), so its contributions come back as a full list.
+        if self._standardizer is not None:
+            scales, _ = self.serving_parameters()
+            offsets = [f * m for f, m in zip(scales, self._standardizer.mean)]
+        else:
+            scales = self.weights
+            offsets = None
+        bias = self.bias
+        sigmoid = self.sigmoid
+        mul = operator.mul
+        probabilities, logits, contributions = [], [], []
+        for x in X:
+            if x.__class__ is SparseRow:
+                if offsets is None:
+                    row = {j: value * scales[j] for j, value in zip(x.indices, x.values)}
+                    z = sum(row.values()) + bias
+                else:
+                    row = [-offset for offset in offsets]
+                    for j, value in zip(x.indices, x.values):
+                        row[j] += value * scales[j]
+                    z = sum(row) + bias
+            else:
+                row = list(map(mul, x, scales))
+                if offsets is not None:
+                    row = list(map(operator.sub, row, offsets))
+                z = sum(row) + bias
+            probabilities.append(sigmoid(z))
+            logits.append(z)
+            contributions.append(row)
+        return probabilities, logits, contributions
+
+    def partial_fit(self, X, y, learning_rate=0.01, epochs=1, batch_size=32):
+        # Warm-started mini-batch SGD on the current weights; returns the mean loss seen
+        if not isinstance(self.weights, array):
+            # Weights mapped from an artifact are read-only
+            self.weights = array('d', self.weights)
+        sparse = bool(X) and X[0].__class__ is SparseRow
+        if sparse:
+            check_sparse_rows(X, self.input_size)
+        if self._standardizer is not None:
+            if sparse:
+                raise ValueError("standardized models cannot be trained on sparse rows")
+            X = self._standardizer.transform_batch(X)
+        weights = self.weights
+        n = len(X)
+        total_loss = 0.0
+        for _ in range(epochs):
+            for start in range(0, n, batch_size):
+                rows = X[start:start + batch_size]
+                targets = y[start:start + batch_size]
+                # Sparse batches accumulate into a dict so the step only touches their non-zeros
+                gradient = {} if sparse else [0.0] * self.input_size
+                bias_gradient = 0.0
+                for x, target in zip(rows, targets):
+                    pred = self.sigmoid(self.dot_product(x, weights) + self.bias)
+                    total_loss -= target * math.log(pred + 1e-8) + (1 - target) * math.log(1 - pred + 1e-8)
+                    error = pred - target
+                    if sparse:
+                        for j, value in zip(x.indices, x.values):
+                            gradient[j] = gradient.get(j, 0.0) + error * value
+                    else:
+                        add_scaled(gradient, x, error)
+                    bias_gradient += error
+                step = learning_rate / len(rows)
+                for j, g in (gradient.items() if sparse else enumerate(gradient)):
+                    weights[j] -= step * g
+                self.bias -= step * bias_gradient
+        self.clear_serving_cache()
+        return total_loss / (n * epochs) if n else 0.0
+
+
+class MultinomialLogisticModel(LinearModel):
+    def __init__(self, input_size, classes, weights=None, bias=None, feature_names=None, standardizer=None):
+        self.classes = list(classes)
+        n_classes = len(self.classes)
+        if n_classes < 2:
+            raise ValueError("a multinomial model needs at least two classes")
+        # Class-major flat weights: row c holds the input_size weights of class c
+        if weights is None:
+            weights = array('d', (random.gauss(0, 0.01) for _ in range(n_classes * input_size)))
+        self.bias = array('d', bias if bias is not None else [0.0] * n_classes)
+        super().__init__(input_size, weights, feature_names, standardizer)
+
+    def class_weights(self):
+        k = self.input_size
+        view = memoryview(self.weights)
+        return [view[c * k:(c + 1) * k] for c in range(len(self.classes))]
+
+    def serving_parameters(self):
+        # Per-class (weights, bias) pairs on raw features, with standardization folded in
+        if self._serving is None:
+            pairs = zip(self.class_weights(), self.bias)
+            if self._standardizer is not None:
+                pairs = (self._standardizer.fold(w, b) for w, b in pairs)
+            self._serving = list(pairs)
+        return self._serving
+
+    @staticmethod
+    def softmax(logits):
+        # Shift by the max logit so exp never overflows
+        top = max(logits)
+        exps = [math.exp(z - top) for z in logits]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def logits(self, x, parameters=None):
+        parameters = parameters or self.serving_parameters()
+        if x.__class__ is SparseRow:
+            return [x.dot(w) + b for w, b in parameters]
+        mul = operator.mul
+        return [sum(map(mul, x, w)) + b for w, b in parameters]
+
+    def predict_proba(self, x):
+        return self.softmax(self.logits(x))
+
+    def predict_proba_batch(self, X):
+        parameters = self.serving_parameters()
+        logits = self.logits
+        softmax = self.softmax
+        return [softmax(logits(x, parameters)) for x in X]
+
+    def predict(self, x):
+        probabilities = self.predict_proba(x)
+        return self.classes[probabilities.index(max(probabilities))]
+
+    def predict_batch(self, X):
+        classes = self.classes
+        return [classes[p.index(max(p))] for p in self.predict_proba_batch(X)]
@@ -0,0 +1,158 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from model import LogisticRegressionModel, MultinomialLogisticModel
+from data_preparation import FeatureSchema
+from standardizer import Standardizer
+
+# Layout (little-endian):
+#   header     magic, format version, model kind, input size, outputs, flags, schema length
+#   schema     UTF-8 JSON (feature names, label, class names, metadata), zero-padded to 8 bytes
+#   weights    float64[input_size * n_outputs], contiguous, one row per output (class)
+#   bias       float64[n_outputs]
+#   mean, std  float64[input_size] each, only with FLAG_STANDARDIZED
+MAGIC = b"CTDTMDL\x00"
+FORMAT_VERSION = 1
+KIND_LOGISTIC = 0
+KIND_MULTINOMIAL = 1
+FLAG_STANDARDIZED = 1
+
+HEADER = struct.Struct("<8sHHIIII4x")
+
+
+class ModelArtifactError(ValueError):
+    pass
+
+
+def _align(offset, boundary=8):
+    return (offset + boundary - 1) // boundary * boundary
+
+
+def save_model(model, path, feature_names=None, label=None, metadata=None):
+    standardizer = model.standardizer
+    schema = {
+        "features": list(feature_names or model.feature_names or []),
+        "label": label,
+        "metadata": metadata or {},
+    }
+    if isinstance(model, MultinomialLogisticModel):
+        kind, n_outputs = KIND_MULTINOMIAL, len(model.classes)
+        schema["classes"] = model.classes
+        bias = array("d", model.bias)
+    else:
+        kind, n_outputs = KIND_LOGISTIC, 1
+        bias = array("d", [model.bias])
+    flags = 0
+    arrays = [array("d", model.weights), bias]
+    if standardizer is not None:
+        flags |= FLAG_STANDARDIZED
+        schema["standardizer_count"] = standardizer.count
+        arrays += [array("d", standardizer.mean), array("d", standardizer.std)]
+    schema_bytes = json.dumps(schema).encode("utf-8")
+    weights_offset = _align(HEADER.size + len(schema_bytes))
+
+    if sys.byteorder != "little":
+        for values in arrays:
+            values.byteswap()
+
+    # Write to a sibling file and rename so readers never observe a half-written model
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, kind, model.input_size, n_outputs, flags, len(schema_bytes)))
+        f.write(schema_bytes)
+        f.write(b"\x00" * (weights_offset - HEADER.size - len(schema_bytes)))
+        for values in arrays:
+            values.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _float_view(buffer, offset, count):
+    view = memoryview(buffer)[offset:offset + 8 * count]
+    if sys.byteorder == "little":
+        # Zero-copy: the values stay in the (shared) mapped pages
+        return view.cast("d")
+    values = array("d", view.tobytes())
+    values.byteswap()
+    return values
+
+
+def _read_layout(buffer, path, expected_input_size):
+    # Everything load_model needs to know before it exposes views into the mapping
+    magic, version, kind, input_size, n_outputs, flags, schema_len = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ModelArtifactError(f"{path}: not a model artifact")
+    if version != FORMAT_VERSION:
+        raise ModelArtifactError(f"{path}: unsupported format version {version}")
+    if not (kind == KIND_LOGISTIC and n_outputs == 1 or kind == KIND_MULTINOMIAL and n_outputs >= 2):
+        raise ModelArtifactError(f"{path}: unsupported model kind {kind}")
+    if expected_input_size is not None and input_size != expected_input_size:
+        raise ModelArtifactError(
+            f"{path}: model expects {input_size} features, service expects {expected_input_size}"
+        )
+
+    try:
+        schema = json.loads(bytes(buffer[HEADER.size:HEADER.size + schema_len]).decode("utf-8"))
+    except ValueError:
+        raise ModelArtifactError(f"{path}: unreadable schema") from None
+    if not isinstance(schema, dict):
+        raise ModelArtifactError(f"{path}: unreadable schema")
+    weights_offset = _align(HEADER.size + schema_len)
+    standardized = bool(flags & FLAG_STANDARDIZED)
+    expected_size = weights_offset + 8 * (input_size * n_outputs + n_outputs)
+    if standardized:
+        expected_size += 8 * 2 * input_size
+    if len(buffer) != expected_size:
+        raise ModelArtifactError(f"{path}: expected {expected_size} bytes, found {len(buffer)}")
+
+    features = schema.get("features") or []
+    if features and len(features) != input_size:
+        raise ModelArtifactError(f"{path}: schema lists {len(features)} features for input size {input_size}")
+    classes = schema.get("classes") or []
+    if kind == KIND_MULTINOMIAL and len(classes) != n_outputs:
+        raise ModelArtifactError(f"{path}: schema lists {len(classes)} classes for {n_outputs} outputs")
+    return kind, input_size, n_outputs, standardized, schema, weights_offset
+
+
+def load_model(path, expected_input_size=None):
+    with open(path, "rb") as f:
+        # mmap refuses an empty file, so check the size first
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ModelArtifactError(f"{path}: file too small to be a model artifact")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        kind, input_size, n_outputs, standardized, schema, weights_offset = _read_layout(
+            buffer, path, expected_input_size)
+    except Exception:
+        # No views exist yet, so a rejected artifact can be unmapped right away
+        buffer.close()
+        raise
+    features = schema.get("features") or []
+
+    weights = _float_view(buffer, weights_offset, input_size * n_outputs)
+    bias_offset = weights_offset + 8 * input_size * n_outputs
+    bias = _float_view(buffer, bias_offset, n_outputs)
+    standardizer = None
+    if standardized:
+        stats_offset = bias_offset + 8 * n_outputs
+        standardizer = Standardizer(
+            input_size,
+            mean=_float_view(buffer, stats_offset, input_size),
+            std=_float_view(buffer, stats_offset + 8 * input_size, input_size),
+            count=schema.get("standardizer_count", 0),
+        )
+
+    if kind == KIND_MULTINOMIAL:
+        model = MultinomialLogisticModel(input_size, schema["classes"], weights=weights, bias=bias,
+                                         feature_names=features, standardizer=standardizer)
+    else:
+        model = LogisticRegressionModel(input_size, weights=weights, bias=bias[0], feature_names=features,
+                                        standardizer=standardizer)
+    model.schema = schema
+    if features:
+        model.feature_schema = FeatureSchema(features, schema.get("label"))
+    return model
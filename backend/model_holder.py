@@ -0,0 +1,105 @@
+import fcntl
+import os
+import threading
+from model import LogisticRegressionModel
+from model_artifact import load_model, save_model
+
+
+class ModelHolder:
+    def __init__(self, path, input_size):
+        self.path = path
+        self.input_size = input_size
+        self.version = 0
+        self._model = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def get(self):
+        # A single attribute read: callers keep the model they got even if a reload swaps it
+        return self._model
+
+    def load_initial(self):
+        if not os.path.exists(self.path):
+            print(f"Model artifact {self.path} not found, serving an untrained model")
+            self.swap(LogisticRegressionModel(input_size=self.input_size))
+            return self._model
+        return self.reload()
+
+    def reload(self):
+        # Load and validate before swapping, so a bad artifact never replaces a good model. The lock
+        # orders this with update_artifact's write of the same file.
+        with self._lock:
+            stamp = self._file_stamp()
+            model = load_model(self.path, expected_input_size=self.input_size)
+            self._model = model
+            self._stamp = stamp
+            self.version += 1
+        return model
+
+    def swap(self, model, stamp=None):
+        with self._lock:
+            self._model = model
+            self._stamp = stamp
+            self.version += 1
+
+    def update(self, fn):
+        # Copy-on-write: fn mutates a private copy, readers keep the old model until the swap
+        with self._lock:
+            model = self._model.copy()
+            result = fn(model)
+            self._model = model
+            self.version += 1
+        return result
+
+    def update_artifact(self, fn):
+        # Like update, but the result is also written to the artifact so every worker (and the next
+        # start) serves it. An exclusive lock on a sibling file serializes updates across worker
+        # processes, and each starts from the newest saved model, so no worker's update is lost.
+        with open(f'{self.path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                model = self._model
+                stamp = self._file_stamp()
+                if stamp is not None and stamp != self._stamp:
+                    # Another worker saved an update this one has not reloaded yet
+                    model = load_model(self.path, expected_input_size=self.input_size)
+                model = model.copy()
+                result = fn(model)
+                save_model(model, self.path, label=model.schema.get("label"), metadata=model.schema.get("metadata"))
+                self._model = model
+                # Our own write is not a change the watcher needs to reload
+                self._stamp = self._file_stamp()
+                self.version += 1
+        return result
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def watch(self, interval=2.0):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _watch_loop(self, interval):
+        while not self._stop.wait(interval):
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                continue
+            try:
+                self.reload()
+                print(f"Reloaded model from {self.path} (version {self.version})")
+            except Exception as e:
+                # Keep serving the previous model; retry once the file changes again
+                self._stamp = stamp
+                print(f"Error reloading model from {self.path}: {e}")
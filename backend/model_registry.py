@@ -0,0 +1,105 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from model_artifact import ModelArtifactError, load_model
+
+# Artifacts live at <root>/<name>/<version>.bin, e.g. artifacts/satellite/3.bin
+ARTIFACT_SUFFIX = '.bin'
+MODEL_NAME_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class UnknownModelError(LookupError):
+    pass
+
+
+class UnavailableModelError(RuntimeError):
+    # The artifact exists but cannot be loaded (corrupt, truncated or half-copied)
+    pass
+
+
+class ModelRegistry:
+    def __init__(self, root, capacity=4, latest_ttl=5.0):
+        self.root = root
+        self.capacity = capacity
+        # name -> (latest version, monotonic time it was listed); re-listed after latest_ttl seconds
+        # or when that version is not resident, so requests served from memory do no directory I/O
+        self.latest_ttl = latest_ttl
+        self._latest = {}
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def versions(self, name):
+        if not MODEL_NAME_RE.match(name):
+            raise UnknownModelError(f'invalid model name {name!r}')
+        try:
+            entries = os.listdir(os.path.join(self.root, name))
+        except FileNotFoundError:
+            return []
+        stems = (entry[:-len(ARTIFACT_SUFFIX)] for entry in entries if entry.endswith(ARTIFACT_SUFFIX))
+        return sorted(int(stem) for stem in stems if stem.isdigit())
+
+    def latest_version(self, name, refresh=False):
+        cached = self._latest.get(name)
+        if cached is not None and not refresh and time.monotonic() - cached[1] < self.latest_ttl:
+            return cached[0]
+        available = self.versions(name)
+        if not available:
+            self._latest.pop(name, None)
+            raise UnknownModelError(f'no artifacts for model {name!r}')
+        self._latest[name] = (available[-1], time.monotonic())
+        return available[-1]
+
+    def resolve_version(self, name, version=None):
+        if version in (None, '', 'latest'):
+            return self.latest_version(name)
+        try:
+            return int(version)
+        except (TypeError, ValueError):
+            raise UnknownModelError(f'invalid version {version!r} for model {name!r}') from None
+
+    def get(self, name, version=None):
+        latest = version in (None, '', 'latest')
+        key = (name, self.resolve_version(name, version))
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+
+        if latest:
+            # About to touch the disk anyway: pick up a version published since the last listing
+            key = (name, self.latest_version(name, refresh=True))
+        path = os.path.join(self.root, name, f'{key[1]}{ARTIFACT_SUFFIX}')
+        if not os.path.exists(path):
+            raise UnknownModelError(f'model {name!r} has no version {key[1]}')
+        # Load outside the lock so a cold model never stalls requests for resident ones
+        try:
+            model = load_model(path)
+        except ModelArtifactError as e:
+            print(f"Could not load model {name!r} version {key[1]}: {e}")
+            raise UnavailableModelError(f'model {name!r} version {key[1]} could not be loaded') from None
+
+        with self._lock:
+            model = self._models.setdefault(key, model)
+            self._models.move_to_end(key)
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'resident': [{'name': name, 'version': version} for name, version in self._models],
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
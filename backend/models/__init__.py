@@ -0,0 +1,6 @@
+# ORM tables; the pydantic request/response schemas live in models.schemas
+from models.base import Base
+from models.user import User
+from models.evaluation import Evaluation
+from models.rollup import EvaluationRollup, RollupWatermark
+from models.revoked_token import RevokedToken
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Index
+from datetime import datetime
+from models.base import Base
+
+class Evaluation(Base):
+    __tablename__ = "evaluations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    twin_id = Column(String, nullable=True)
+    application = Column(String)
+    final_score = Column(Float)
+    classification = Column(String)
+    total_energy_consumption = Column(Float)
+    component_count = Column(Integer)
+    detailed_scores = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Fold that added this row to the rollups; NULL until then
+    rollup_batch = Column(Integer, nullable=True, index=True)
+
+    # History pages walk (created_at, id) backwards inside one user's (or one twin's) rows
+    __table_args__ = (
+        Index("ix_evaluations_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_evaluations_user_twin_created_id", "user_id", "twin_id", "created_at", "id"),
+    )
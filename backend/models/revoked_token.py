@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from models.base import Base
+
+class RevokedToken(Base):
+    # Revoked JWT ids; rows are dropped once the token would have expired anyway
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String, unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # RevocationList.sync reads new rows by id, so pruned ids must not be handed out again
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float
+from models.base import Base
+
+class EvaluationRollup(Base):
+    # Evaluation counts and sums per (day, application, user, classification). Missing
+    # applications are stored as "" and anonymous evaluations as user 0 so the key stays non-null
+    __tablename__ = "evaluation_rollups"
+
+    day = Column(String(10), primary_key=True)
+    application = Column(String, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    classification = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    energy_sum = Column(Float, nullable=False, default=0.0)
+
+class RollupWatermark(Base):
+    # Number of the last fold; its row is also the lock that serializes folds
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    last_batch = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,10 @@
+from passlib.context import CryptContext
+
+# Shared by the FastAPI auth routes and the user import, which hashes in worker processes
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def verify_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password: str):
+    return pwd_context.hash(password)
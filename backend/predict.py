@@ -1,4 +1,33 @@
+from model import SparseRow
+
+
+class InvalidRowsError(ValueError):
+    pass
+
+
 def predict(model, input_data):
     if not isinstance(input_data, list):
         input_data = list(input_data)
     return model.predict(input_data)
+
+def predict_batch(model, rows):
+    return model.predict_batch(rows)
+
+def check_rows(model, rows):
+    # The batch scorers zip rows against the weights, so a short or long row would be silently
+    # truncated and a non-numeric value fails every row scored with it; reject both up front
+    if not isinstance(rows, list):
+        raise InvalidRowsError('expected a list of rows')
+    size = model.input_size
+    for i, row in enumerate(rows):
+        if row.__class__ is SparseRow:
+            if row.indices and max(row.indices) >= size:
+                raise InvalidRowsError(f'row {i} has a feature index past the model width {size}')
+            continue
+        try:
+            n_values = len(row)
+            sum(row, 0.0)
+        except TypeError:
+            raise InvalidRowsError(f'row {i} must be a list of numbers') from None
+        if n_values != size:
+            raise InvalidRowsError(f'row {i} has {n_values} values, expected {size}')
@@ -0,0 +1,166 @@
+import atexit
+import hashlib
+import math
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+# Cost of one request: base tokens plus tokens per KiB of body. Charged from Content-Length before
+# the body is read, so an oversized payload is refused without being parsed. Roughly 0.1 per
+# /evaluate component and 0.01 per /predict row.
+ENDPOINT_COSTS = {
+    'evaluate': (1.0, 1.25),
+    'predict': (1.0, 0.5),
+}
+LOCAL_MAX_KEYS = 100000
+SHARED_PROBES = 8
+
+
+def _refill(tokens, last, cost, rate, burst, now):
+    # Returns (tokens left, seconds until cost is available); a request costing more than the
+    # whole bucket is charged the full bucket so it can still get through eventually
+    tokens = min(burst, tokens + (now - last) * rate)
+    cost = min(cost, burst)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class LocalBuckets:
+    # Per-process buckets in a plain dict. There is no lock: each update is one tuple store under
+    # the GIL, and two threads racing on the same key can at worst both be admitted once.
+    def __init__(self, max_keys=LOCAL_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def consume(self, key, cost, rate, burst, now):
+        tokens, last = self._buckets.get(key, (burst, now))
+        tokens, retry_after = _refill(tokens, last, cost, rate, burst, now)
+        if len(self._buckets) >= self.max_keys and key not in self._buckets:
+            self._prune(now, rate, burst)
+        self._buckets[key] = (tokens, now)
+        return retry_after
+
+    def _prune(self, now, rate, burst):
+        # Buckets that have refilled completely carry no state worth keeping
+        for key, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * rate >= burst:
+                self._buckets.pop(key, None)
+
+
+class SharedBuckets:
+    # Buckets in a shared-memory hash table (key hash, tokens, last refill) so every gunicorn worker
+    # forked from the master draws from the same budget. Needs preload_app: the table and its lock
+    # are created once in the master and inherited. A full probe window evicts its stalest slot.
+    SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, slots=65536):
+        self.slots = slots
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * self.SLOT.size)
+        self._lock = multiprocessing.Lock()
+        self._owner = os.getpid()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _hash(key):
+        # Never 0, which marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') | 1
+
+    def consume(self, key, cost, rate, burst, now):
+        key_hash = self._hash(key)
+        buf = self._shm.buf
+        slot_size = self.SLOT.size
+        with self._lock:
+            target = None
+            stalest = None
+            for probe in range(SHARED_PROBES):
+                offset = ((key_hash + probe) % self.slots) * slot_size
+                slot_hash, tokens, last = self.SLOT.unpack_from(buf, offset)
+                if slot_hash == key_hash:
+                    target = offset
+                    break
+                if slot_hash == 0:
+                    target, tokens, last = offset, burst, now
+                    break
+                if stalest is None or last < stalest[2]:
+                    stalest = (offset, tokens, last)
+            if target is None:
+                target, tokens, last = stalest[0], burst, now
+            tokens, retry_after = _refill(tokens, last, cost, rate, burst, now)
+            self.SLOT.pack_into(buf, target, key_hash, tokens, now)
+        return retry_after
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        if os.getpid() == self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+class RateLimiter:
+    # One bucket per authenticated user, or per client IP for anonymous requests
+    def __init__(self, buckets, user_rate, user_burst, ip_rate, ip_burst, costs=ENDPOINT_COSTS):
+        self.buckets = buckets
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.costs = costs
+        self.checked = 0
+        self.rejected = 0
+
+    def cost(self, endpoint, content_length):
+        # A body of unknown length (chunked) is charged the whole bucket
+        base, per_kib = self.costs[endpoint]
+        if content_length is None:
+            return math.inf
+        return base + per_kib * content_length / 1024
+
+    def check(self, endpoint, content_length, user=None, ip=None):
+        # Seconds the caller should wait before retrying, or 0.0 when the request is admitted
+        cost = self.cost(endpoint, content_length)
+        if user is not None:
+            key, rate, burst = f'user:{user}', self.user_rate, self.user_burst
+        else:
+            key, rate, burst = f'ip:{ip}', self.ip_rate, self.ip_burst
+        retry_after = self.buckets.consume(key, cost, rate, burst, time.monotonic())
+        self.checked += 1
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def stats(self):
+        # Counters are per worker process
+        return {
+            'backend': 'shared' if isinstance(self.buckets, SharedBuckets) else 'local',
+            'checked': self.checked,
+            'rejected': self.rejected,
+            'user_rate': self.user_rate,
+            'user_burst': self.user_burst,
+            'ip_rate': self.ip_rate,
+            'ip_burst': self.ip_burst,
+        }
+
+
+def retry_after_header(retry_after):
+    return str(max(1, math.ceil(retry_after)))
+
+
+def limiter_from_env():
+    if os.environ.get('RATE_LIMIT', '0') != '1':
+        return None
+    if os.environ.get('RATE_LIMIT_BACKEND', 'local') == 'shared':
+        buckets = SharedBuckets(slots=int(os.environ.get('RATE_LIMIT_SHARED_SLOTS', 65536)))
+    else:
+        buckets = LocalBuckets()
+    return RateLimiter(
+        buckets,
+        user_rate=float(os.environ.get('RATE_LIMIT_USER_RATE', 50.0)),
+        user_burst=float(os.environ.get('RATE_LIMIT_USER_BURST', 250.0)),
+        ip_rate=float(os.environ.get('RATE_LIMIT_IP_RATE', 20.0)),
+        ip_burst=float(os.environ.get('RATE_LIMIT_IP_BURST', 100.0)),
+    )
@@ -0,0 +1,161 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from database import engine
+from models import RevokedToken
+
+BLOOM_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.001
+REVOCATION_SYNC_INTERVAL = float(os.environ.get('REVOCATION_SYNC_INTERVAL', 5.0))
+
+
+class BloomFilter:
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.n_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    # Revoked token ids held in memory: a Bloom filter answers "definitely not revoked" for almost
+    # every token without touching the exact set, and never the database. sync() pulls rows added
+    # since the last sync (by id) and drops entries whose tokens have expired, in memory and in the
+    # table, every sync_interval seconds from a background thread. Ids are only a fast path: a row
+    # committed below the last seen id (a concurrent insert on PostgreSQL, or an old table that
+    # reuses pruned rowids) shows up as a count mismatch and triggers a full reload.
+    def __init__(self, engine, sync_interval=REVOCATION_SYNC_INTERVAL, capacity=BLOOM_CAPACITY,
+                 error_rate=BLOOM_ERROR_RATE):
+        self.engine = engine
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.last_sync = None
+        self._expiry = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._syncer = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def is_revoked(self, jti):
+        if self._pid != os.getpid() and self.sync_interval > 0:
+            self.start()
+        if jti is None or jti not in self._bloom:
+            return False
+        return jti in self._expiry
+
+    def _add(self, jti, expires_at):
+        self._expiry[jti] = expires_at
+        if len(self._expiry) > self._bloom.capacity:
+            self._rebuild(self._bloom.capacity * 2)
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild(self, capacity):
+        # Bloom filters cannot delete, so pruning or growth builds a fresh one and swaps it in
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._expiry:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def revoke(self, jti, expires_at):
+        # expires_at: the token's exp as a naive UTC datetime
+        with self._lock:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(RevokedToken).values(jti=jti, expires_at=expires_at))
+            except IntegrityError:
+                pass
+            self._add(jti, expires_at)
+
+    def sync(self):
+        now = datetime.utcnow()
+        with self._lock:
+            with self.engine.begin() as conn:
+                conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+                rows = conn.execute(
+                    select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+                    .where(RevokedToken.id > self._last_id, RevokedToken.expires_at > now)
+                    .order_by(RevokedToken.id)
+                ).all()
+                for row_id, jti, expires_at in rows:
+                    self._add(jti, expires_at)
+                    self._last_id = row_id
+                self._drop_expired(now)
+                # Every entry held here is also in the table, so equal counts mean equal sets
+                stored = conn.execute(select(func.count()).select_from(RevokedToken)
+                                      .where(RevokedToken.expires_at > now)).scalar()
+                if stored != len(self._expiry):
+                    rows = self._reload(conn, now)
+            self.last_sync = time.time()
+        return len(rows)
+
+    def _drop_expired(self, now):
+        expired = [jti for jti, expires_at in self._expiry.items() if expires_at <= now]
+        if expired:
+            for jti in expired:
+                del self._expiry[jti]
+            self._rebuild(max(self.capacity, len(self._expiry) * 2))
+
+    def _reload(self, conn, now):
+        rows = conn.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > now)
+        ).all()
+        self._expiry = {jti: expires_at for _, jti, expires_at in rows}
+        self._last_id = max((row_id for row_id, _, _ in rows), default=self._last_id)
+        self._rebuild(max(self.capacity, len(self._expiry) * 2))
+        return rows
+
+    def start(self):
+        # Started lazily (and again after a fork) so each server worker syncs its own copy
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._syncer = threading.Thread(target=self._sync_loop, daemon=True)
+            self._syncer.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Revocation list sync failed: {e}")
+
+    def stats(self):
+        return {
+            'revoked': len(self._expiry),
+            'bloom_bits': self._bloom.n_bits,
+            'bloom_hashes': self._bloom.n_hashes,
+            'last_sync': self.last_sync,
+        }
+
+
+revocation_list = RevocationList(engine)
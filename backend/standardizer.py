@@ -0,0 +1,59 @@
+import math
+from array import array
+
+
+class Standardizer:
+    def __init__(self, n_features, mean=None, std=None, count=0):
+        self.n_features = n_features
+        self.count = count
+        self.mean = array('d', mean if mean is not None else [0.0] * n_features)
+        # Sum of squared deviations (Welford's M2); rebuilt from std when loaded from an artifact
+        if std is not None:
+            self._m2 = array('d', (s * s * count for s in std))
+            self._std = array('d', std)
+        else:
+            self._m2 = array('d', [0.0] * n_features)
+            self._std = None
+
+    @classmethod
+    def fit(cls, rows, n_features):
+        standardizer = cls(n_features)
+        standardizer.update(rows)
+        return standardizer
+
+    def update(self, rows):
+        # One streaming pass with Welford's algorithm: numerically stable, O(features) memory
+        mean = self.mean
+        m2 = self._m2
+        count = self.count
+        for row in rows:
+            count += 1
+            for j, value in enumerate(row):
+                delta = value - mean[j]
+                mean[j] += delta / count
+                m2[j] += delta * (value - mean[j])
+        self.count = count
+        self._std = None
+
+    @property
+    def std(self):
+        if self._std is None:
+            # Constant features get a unit scale so they pass through centred instead of dividing by zero
+            self._std = array('d', (
+                math.sqrt(m2 / self.count) if self.count and m2 > 0 else 1.0 for m2 in self._m2
+            ))
+        return self._std
+
+    def transform(self, row):
+        return [(value - m) / s for value, m, s in zip(row, self.mean, self.std)]
+
+    def transform_batch(self, rows):
+        mean = self.mean
+        std = self.std
+        return [[(value - m) / s for value, m, s in zip(row, mean, std)] for row in rows]
+
+    def fold(self, weights, bias):
+        # w·((x - mean) / std) + b == (w / std)·x + (b - Σ w·mean / std), so predictions on raw
+        # features need no per-row transform at all
+        folded = array('d', (w / s for w, s in zip(weights, self.std)))
+        return folded, bias - sum(f * m for f, m in zip(folded, self.mean))
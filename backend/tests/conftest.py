@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# The backend modules import each other by bare name (`from models import User`), as they do
+# when the app runs from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app opens ./app.db; run from a scratch directory so the tests never touch a real database
+os.chdir(tempfile.mkdtemp(prefix='ctdt-tests-'))
@@ -0,0 +1,63 @@
+import threading
+from array import array
+from batching import MicroBatcher
+from model import LogisticRegressionModel
+from predict import InvalidRowsError, predict_batch
+
+
+def test_bad_request_does_not_fail_others_in_its_window():
+    model = LogisticRegressionModel(3, array('d', [0.5, -0.25, 1.0]), 0.1)
+    batcher = MicroBatcher(lambda: model, max_wait_ms=200.0, max_batch_rows=256)
+    good_rows = [[1.0, 2.0, 3.0], [0.0, 0.5, 1.0]]
+    submissions = {'good': good_rows, 'short': [[1.0]], 'text': [[1.0, 'x', 3.0]]}
+    results = {}
+
+    def submit(name):
+        try:
+            results[name] = batcher.submit(submissions[name])
+        except Exception as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=submit, args=(name,)) for name in submissions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results['good'] == predict_batch(model, good_rows)
+    assert isinstance(results['short'], InvalidRowsError)
+    assert isinstance(results['text'], InvalidRowsError)
+    # All three arrived inside one window; only the valid request was scored
+    stats = batcher.stats.snapshot()
+    assert stats['batches'] == 1
+    assert stats['requests'] == 1
+
+
+def test_failing_merged_call_falls_back_to_per_request_scoring():
+    class FlakyModel(LogisticRegressionModel):
+        def predict_batch(self, X):
+            if any(x[0] == 99.0 for x in X) and len(X) > 1:
+                raise RuntimeError('cannot score this batch')
+            if any(x[0] == 99.0 for x in X):
+                raise RuntimeError('cannot score this row')
+            return super().predict_batch(X)
+
+    model = FlakyModel(3, array('d', [0.5, -0.25, 1.0]), 0.1)
+    batcher = MicroBatcher(lambda: model, max_wait_ms=200.0, max_batch_rows=256)
+    results = {}
+
+    def submit(name, rows):
+        try:
+            results[name] = batcher.submit(rows)
+        except Exception as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=submit, args=('good', [[1.0, 2.0, 3.0]])),
+               threading.Thread(target=submit, args=('bad', [[99.0, 0.0, 0.0]]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results['good'] == LogisticRegressionModel.predict_batch(model, [[1.0, 2.0, 3.0]])
+    assert isinstance(results['bad'], RuntimeError)
@@ -0,0 +1,74 @@
+import struct
+import pytest
+from binary_io import (MATRIX_HEADER, MATRIX_MAGIC, MATRIX_MIMETYPE, MATRIX_VERSION, NPY_MAGIC, NPY_MIMETYPE,
+                       BinaryFormatError, decode_rows, encode_column, encode_matrix)
+
+
+def npy(header, payload=b''):
+    header = header.encode('latin1')
+    return NPY_MAGIC + b'\x01\x00' + struct.pack('<H', len(header)) + header + payload
+
+
+@pytest.mark.parametrize('mimetype', [MATRIX_MIMETYPE, NPY_MIMETYPE])
+@pytest.mark.parametrize('typecode', ['f', 'd'])
+def test_matrix_round_trip(mimetype, typecode):
+    values = [0.5, 1.5, 2.5, -3.0, 4.25, 0.0]
+    rows, n_cols, decoded_typecode = decode_rows(encode_matrix(values, 3, mimetype, typecode), mimetype)
+    assert (n_cols, decoded_typecode) == (3, typecode)
+    assert [list(row) for row in rows] == [values[:3], values[3:]]
+
+
+@pytest.mark.parametrize('mimetype', [MATRIX_MIMETYPE, NPY_MIMETYPE])
+def test_column_round_trip(mimetype):
+    rows, n_cols, _ = decode_rows(encode_column([0.25, 0.75], mimetype), mimetype)
+    if mimetype == NPY_MIMETYPE:
+        # A 1-d array reads back as a single row
+        assert n_cols == 2 and [list(row) for row in rows] == [[0.25, 0.75]]
+    else:
+        assert n_cols == 1 and [list(row) for row in rows] == [[0.25], [0.75]]
+
+
+def test_npy_header_is_padded_like_numpy():
+    body = encode_matrix([1.0, 2.0], 2, NPY_MIMETYPE)
+    header_len, = struct.unpack_from('<H', body, 8)
+    assert (10 + header_len) % 64 == 0
+
+
+@pytest.mark.parametrize('body', [
+    b'',
+    b'not numpy at all',
+    NPY_MAGIC + b'\x09\x00' + b'\x00' * 8,
+    npy("[1, 2, 3]"),
+    npy("{'descr': '<f8', 'fortran_order': False}"),
+    npy("{'descr': '<f8', 'fortran_order': False, 'shape': 3}"),
+    npy("{'descr': '<f8', 'fortran_order': False, 'shape': (2, 'x')}"),
+    npy("{'descr': '<f8', 'fortran_order': False, 'shape': (-1, 2)}"),
+    npy("{'descr': '<f8', 'fortran_order': False, 'shape': (1, 1, 1)}", b'\x00' * 8),
+    npy("{'descr': ['<f8'], 'fortran_order': False, 'shape': (1, 1)}", b'\x00' * 8),
+    npy("{'descr': '<i4', 'fortran_order': False, 'shape': (1, 1)}", b'\x00' * 4),
+    npy("{'descr': '<f8', 'fortran_order': True, 'shape': (1, 1)}", b'\x00' * 8),
+    npy("{'descr': '<f8', 'fortran_order': False, 'shape': (2, 2)}", b'\x00' * 8),
+    npy("{'descr': '<f8', 'fortran_order': False, 'shape': (4, 0)}"),
+    npy("{'descr': '<f8', 'fortran_order': False, 'sha"),
+    npy("__import__('os')"),
+])
+def test_malformed_npy_is_a_format_error(body):
+    with pytest.raises(BinaryFormatError):
+        decode_rows(body, NPY_MIMETYPE)
+
+
+@pytest.mark.parametrize('body', [
+    b'CTDM',
+    MATRIX_HEADER.pack(b'XXXX', MATRIX_VERSION, b'd', 1, 1) + b'\x00' * 8,
+    MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION + 1, b'd', 1, 1) + b'\x00' * 8,
+    MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, b'q', 1, 1) + b'\x00' * 8,
+    MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, b'd', 2, 2) + b'\x00' * 8,
+    MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, b'd', 3, 0),
+])
+def test_malformed_matrix_is_a_format_error(body):
+    with pytest.raises(BinaryFormatError):
+        decode_rows(body, MATRIX_MIMETYPE)
+
+
+def test_empty_matrix_decodes_to_no_rows():
+    assert decode_rows(MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_VERSION, b'd', 0, 0), MATRIX_MIMETYPE)[0] == []
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, insert, select
+from evaluation_rollups import evaluation_analytics, fold_evaluations
+from evaluation_store import fetch_history
+from models import Base, Evaluation, User
+
+START = datetime(2026, 3, 1, 12)
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'evaluations.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': i, 'email': f'u{i}@example.com', 'name': f'U{i}', 'hashed_password': 'x'}
+                                    for i in (1, 2)])
+    return engine
+
+
+def evaluation(i, **values):
+    row = {
+        'user_id': (1, 2, None)[i % 3],
+        'application': ('satellite', 'rehabilitation')[i % 2],
+        'final_score': 50.0 + i % 40,
+        'classification': ('Ecologic', 'Moderate', 'Not Ecologic')[i % 3],
+        'total_energy_consumption': 10.0 * (i % 7),
+        'component_count': 3,
+        'detailed_scores': {},
+        'created_at': START + timedelta(hours=7 * i),
+    }
+    row.update(values)
+    return row
+
+
+def raw_counts(conn):
+    day = func.date(Evaluation.created_at)
+    return {str(d): (n, s) for d, n, s in conn.execute(
+        select(day, func.count(), func.sum(Evaluation.final_score)).group_by(day))}
+
+
+def analytics_counts(conn):
+    return {bucket['day']: (bucket['evaluations'], bucket['average_score'] * bucket['evaluations'])
+            for bucket in evaluation_analytics(conn, group_by=('day',))['buckets']}
+
+
+def assert_matches_raw(conn):
+    raw = raw_counts(conn)
+    report = analytics_counts(conn)
+    assert report.keys() == raw.keys()
+    for day, (count, score_sum) in raw.items():
+        assert report[day][0] == count
+        assert abs(report[day][1] - score_sum) < 1e-6
+
+
+def test_analytics_match_raw_rows_before_and_after_folding(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(insert(Evaluation), [evaluation(i) for i in range(60)])
+        assert_matches_raw(conn)
+        assert fold_evaluations(conn) == 60
+        assert fold_evaluations(conn) == 0
+        assert_matches_raw(conn)
+        conn.execute(insert(Evaluation), [evaluation(i) for i in range(60, 75)])
+        assert_matches_raw(conn)
+
+
+def test_row_committed_below_folded_ids_is_still_folded(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(insert(Evaluation), [evaluation(i, id=100 + i) for i in range(10)])
+        fold_evaluations(conn)
+    # A writer that took a lower id earlier commits after the fold
+    with engine.begin() as conn:
+        conn.execute(insert(Evaluation), [evaluation(50, id=5)])
+        assert fold_evaluations(conn) == 1
+        assert conn.execute(select(func.count()).where(Evaluation.rollup_batch.is_(None))).scalar() == 0
+        assert_matches_raw(conn)
+
+
+def test_group_by_user_and_application(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(insert(Evaluation), [evaluation(i) for i in range(30)])
+        fold_evaluations(conn)
+        report = evaluation_analytics(conn, group_by=('user_id', 'application'), application='satellite')
+    assert {(b['user_id'], b['application']) for b in report['buckets']} == {
+        (1, 'satellite'), (2, 'satellite'), (None, 'satellite')}
+    assert sum(b['evaluations'] for b in report['buckets']) == 15
+
+
+def test_history_items_leave_out_the_rollup_stamp(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(insert(Evaluation), [evaluation(i, user_id=1) for i in range(3)])
+        fold_evaluations(conn)
+        page = fetch_history(conn, 1, limit=2)
+    assert len(page['items']) == 2 and page['next_cursor'] is not None
+    assert set(page['items'][0]) == {
+        'id', 'user_id', 'twin_id', 'application', 'final_score', 'classification', 'total_energy_consumption',
+        'component_count', 'detailed_scores', 'created_at',
+    }
@@ -0,0 +1,81 @@
+from array import array
+
+import pytest
+
+from model import LinearModel, LogisticRegressionModel, MultinomialLogisticModel, SparseRow
+from standardizer import Standardizer
+from train import train_model, train_multinomial
+
+ROWS = [[0.5, 1.5, 2.0], [2.0, 0.5, 1.0], [1.0, 1.0, 3.0], [3.0, 2.5, 0.5]]
+
+
+def binary_model():
+    return LogisticRegressionModel(3, array('d', [0.3, -0.2, 0.1]), 0.05, ['a', 'b', 'c'])
+
+
+def multinomial_model():
+    return MultinomialLogisticModel(3, ['x', 'y'], array('d', [0.3, -0.2, 0.1, -0.1, 0.4, 0.2]), [0.05, -0.05])
+
+
+@pytest.mark.parametrize('make', [binary_model, multinomial_model])
+def test_copy_owns_weights_and_bias(make):
+    model = make()
+    model.standardizer = Standardizer.fit(ROWS, 3)
+    model.schema = {'source': 'test'}
+    before = model.predict_batch(ROWS)
+    clone = model.copy()
+    assert isinstance(clone, type(model)) and isinstance(clone, LinearModel)
+    assert clone.predict_batch(ROWS) == before
+
+    clone.weights[0] += 5.0
+    if isinstance(clone.bias, array):
+        clone.bias[0] += 1.0
+    else:
+        clone.bias += 1.0
+    clone.clear_serving_cache()
+    assert model.predict_batch(ROWS) == before
+    assert clone.predict_batch(ROWS) != before
+    assert clone.standardizer is model.standardizer and clone.schema is model.schema
+
+
+def test_copy_of_mapped_weights_is_writable():
+    model = binary_model()
+    model.weights = memoryview(bytes(model.weights)).cast('d')
+    clone = model.copy()
+    clone.weights[1] = 1.0
+    assert model.weights[1] == -0.2
+
+
+def test_trainers_report_the_same_progress_fields():
+    reports = []
+    callback = lambda model, progress: reports.append(progress)
+    train_model(ROWS, [0, 1, 0, 1], 3, num_epochs=2, callback=callback, seed=1)
+    train_multinomial(ROWS, ['x', 'y', 'x', 'y'], 3, num_epochs=2, callback=callback)
+    assert [r['epoch'] for r in reports] == [1, 2, 1, 2]
+    assert all(set(r) == {'epoch', 'num_epochs', 'loss', 'rows_per_second', 'eta_seconds'} for r in reports)
+    assert reports[1]['eta_seconds'] == 0.0 and reports[3]['eta_seconds'] == 0.0
+
+
+def standardized_model():
+    model = binary_model()
+    model.standardizer = Standardizer.fit(ROWS, 3)
+    return model
+
+
+@pytest.mark.parametrize('make', [binary_model, standardized_model])
+def test_explain_matches_predict_for_dense_and_sparse_rows(make):
+    model = make()
+    dense = [[0.0, 1.5, 0.0], [2.0, 0.0, 1.0]]
+    sparse = [SparseRow([1], [1.5]), SparseRow([0, 2], [2.0, 1.0])]
+    expected = model.predict_batch(dense)
+    assert model.predict_batch(sparse) == pytest.approx(expected)
+    for rows in (dense, sparse):
+        probabilities, logits, contributions = model.explain_batch(rows)
+        assert probabilities == pytest.approx(expected)
+        for z, row in zip(logits, contributions):
+            values = row.values() if isinstance(row, dict) else row
+            assert sum(values) + model.bias == pytest.approx(z)
+    if model.standardizer is not None:
+        # Absent features still move a standardized logit, so the contributions are not sparse
+        for sparse_row, dense_row in zip(model.explain_batch(sparse)[2], model.explain_batch(dense)[2]):
+            assert sparse_row == pytest.approx(dense_row)
@@ -0,0 +1,111 @@
+import mmap
+import struct
+from array import array
+
+import pytest
+
+import model_artifact
+from model import LogisticRegressionModel, MultinomialLogisticModel
+from model_artifact import FORMAT_VERSION, HEADER, ModelArtifactError, load_model, save_model
+from standardizer import Standardizer
+
+ROWS = [[0.5, 1.5, 2.0], [2.0, 0.5, 1.0], [1.0, 1.0, 3.0]]
+
+
+def binary_model(standardized=False):
+    model = LogisticRegressionModel(3, array('d', [0.3, -0.2, 0.1]), 0.05)
+    if standardized:
+        model.standardizer = Standardizer.fit(ROWS, 3)
+    return model
+
+
+@pytest.mark.parametrize('standardized', [False, True])
+def test_binary_round_trip(tmp_path, standardized):
+    model = binary_model(standardized)
+    path = tmp_path / 'model.bin'
+    save_model(model, path, ['a', 'b', 'c'], label='y', metadata={'epoch': 3})
+
+    loaded = load_model(path, expected_input_size=3)
+    assert isinstance(loaded, LogisticRegressionModel)
+    assert list(loaded.weights) == list(model.weights) and loaded.bias == model.bias
+    assert (loaded.standardizer is not None) == standardized
+    if standardized:
+        assert list(loaded.standardizer.mean) == list(model.standardizer.mean)
+        assert list(loaded.standardizer.std) == list(model.standardizer.std)
+        assert loaded.standardizer.count == 3
+    assert loaded.predict_batch(ROWS) == model.predict_batch(ROWS)
+    assert loaded.feature_names == ['a', 'b', 'c']
+    assert loaded.feature_schema.label == 'y' and loaded.schema['metadata'] == {'epoch': 3}
+
+
+def test_multinomial_round_trip(tmp_path):
+    model = MultinomialLogisticModel(3, ['x', 'y', 'z'], array('d', range(9)), [0.1, 0.2, 0.3])
+    path = tmp_path / 'model.bin'
+    save_model(model, path)
+
+    loaded = load_model(path)
+    assert isinstance(loaded, MultinomialLogisticModel)
+    assert loaded.classes == ['x', 'y', 'z'] and list(loaded.bias) == [0.1, 0.2, 0.3]
+    assert loaded.predict_proba_batch(ROWS) == model.predict_proba_batch(ROWS)
+    assert loaded.feature_schema is None
+
+
+def rewrite_header(path, **fields):
+    data = bytearray(path.read_bytes())
+    names = ['magic', 'version', 'kind', 'input_size', 'n_outputs', 'flags', 'schema_len']
+    values = dict(zip(names, HEADER.unpack_from(data, 0)))
+    values.update(fields)
+    HEADER.pack_into(data, 0, *(values[name] for name in names))
+    path.write_bytes(bytes(data))
+
+
+@pytest.mark.parametrize('fields, message', [
+    ({'magic': b'NOTAMDL\x00'}, 'not a model artifact'),
+    ({'version': FORMAT_VERSION + 1}, 'unsupported format version'),
+    ({'kind': 7}, 'unsupported model kind'),
+    ({'input_size': 4}, 'expected'),
+    # The standardized flag promises mean and std arrays the file does not have
+    ({'flags': model_artifact.FLAG_STANDARDIZED}, 'expected'),
+    ({'schema_len': 3}, 'unreadable schema'),
+])
+def test_rejects_bad_headers(tmp_path, fields, message):
+    path = tmp_path / 'model.bin'
+    save_model(binary_model(), path)
+    rewrite_header(path, **fields)
+    with pytest.raises(ModelArtifactError, match=message):
+        load_model(path)
+
+
+def test_rejects_wrong_input_size_and_truncation(tmp_path):
+    path = tmp_path / 'model.bin'
+    save_model(binary_model(), path)
+    with pytest.raises(ModelArtifactError, match='service expects 4'):
+        load_model(path, expected_input_size=4)
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(ModelArtifactError, match='bytes'):
+        load_model(path)
+
+
+@pytest.mark.parametrize('content', [b'', b'CTDT', struct.pack('<8s', b'CTDTMDL\x00')])
+def test_rejects_empty_and_short_files(tmp_path, content):
+    path = tmp_path / 'model.bin'
+    path.write_bytes(content)
+    with pytest.raises(ModelArtifactError, match='too small'):
+        load_model(path)
+
+
+def test_rejected_artifact_is_unmapped(tmp_path, monkeypatch):
+    mappings = []
+    real_mmap = mmap.mmap
+
+    def tracking_mmap(*args, **kwargs):
+        mappings.append(real_mmap(*args, **kwargs))
+        return mappings[-1]
+
+    monkeypatch.setattr(model_artifact.mmap, 'mmap', tracking_mmap)
+    path = tmp_path / 'model.bin'
+    save_model(binary_model(), path)
+    rewrite_header(path, version=FORMAT_VERSION + 1)
+    with pytest.raises(ModelArtifactError):
+        load_model(path)
+    assert len(mappings) == 1 and mappings[0].closed
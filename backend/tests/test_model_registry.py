@@ -0,0 +1,83 @@
+import importlib
+import os
+from array import array
+
+import pytest
+
+import model_registry
+from model import LogisticRegressionModel
+from model_artifact import save_model
+from model_registry import ModelRegistry, UnavailableModelError, UnknownModelError
+
+
+def publish(root, name, version, bias=0.0):
+    os.makedirs(root / name, exist_ok=True)
+    save_model(LogisticRegressionModel(3, array('d', [0.1, 0.2, 0.3]), bias), root / name / f'{version}.bin')
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    calls = []
+    listdir = os.listdir
+    monkeypatch.setattr(model_registry.os, 'listdir', lambda path: calls.append(path) or listdir(path))
+    return calls
+
+
+def test_resident_latest_model_needs_no_directory_listing(tmp_path, listings):
+    publish(tmp_path, 'satellite', 1)
+    registry = ModelRegistry(str(tmp_path), latest_ttl=60.0)
+    first = registry.get('satellite')
+    listed = len(listings)
+    for _ in range(5):
+        assert registry.get('satellite') is first
+        assert registry.get('satellite', 'latest') is first
+    assert len(listings) == listed
+    assert registry.stats()['hits'] == 10
+
+
+def test_new_version_is_picked_up_after_the_ttl(tmp_path, listings, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(model_registry.time, 'monotonic', lambda: clock[0])
+    publish(tmp_path, 'satellite', 1, bias=1.0)
+    registry = ModelRegistry(str(tmp_path), latest_ttl=5.0)
+    assert registry.get('satellite').bias == 1.0
+    publish(tmp_path, 'satellite', 2, bias=2.0)
+    clock[0] += 1.0
+    assert registry.get('satellite').bias == 1.0
+    clock[0] += 5.0
+    assert registry.get('satellite').bias == 2.0
+
+
+def test_a_miss_relists_the_versions(tmp_path):
+    publish(tmp_path, 'satellite', 1, bias=1.0)
+    registry = ModelRegistry(str(tmp_path), capacity=1, latest_ttl=60.0)
+    registry.get('satellite')
+    publish(tmp_path, 'satellite', 2, bias=2.0)
+    publish(tmp_path, 'rover', 1)
+    # Evicts satellite 1, so the next latest lookup goes to disk and finds version 2
+    registry.get('rover')
+    assert registry.get('satellite').bias == 2.0
+
+
+def test_corrupt_artifact_is_unavailable_not_cached(tmp_path):
+    os.makedirs(tmp_path / 'satellite')
+    (tmp_path / 'satellite' / '1.bin').write_bytes(b'')
+    registry = ModelRegistry(str(tmp_path))
+    with pytest.raises(UnavailableModelError):
+        registry.get('satellite')
+    publish(tmp_path, 'satellite', 1)
+    assert registry.get('satellite', '1').bias == 0.0
+    with pytest.raises(UnknownModelError):
+        registry.get('rover')
+
+
+def test_predict_answers_json_for_a_corrupt_artifact(tmp_path, monkeypatch):
+    main = importlib.import_module('main')
+    os.makedirs(tmp_path / 'satellite')
+    (tmp_path / 'satellite' / '1.bin').write_bytes(b'not a model artifact, but long enough to have a header')
+    monkeypatch.setattr(main, 'model_registry', ModelRegistry(str(tmp_path)))
+    client = main.app.test_client()
+    response = client.post('/predict?model=satellite', json=[[0.5, 1.5, 2.5, 0]])
+    assert response.status_code == 503
+    assert 'could not be loaded' in response.get_json()['error']
+    assert client.post('/predict?model=rover', json=[[0.5, 1.5, 2.5, 0]]).status_code == 404
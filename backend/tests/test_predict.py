@@ -0,0 +1,44 @@
+import importlib
+import pytest
+from array import array
+from model import LogisticRegressionModel
+from predict import InvalidRowsError, check_rows, predict_batch
+
+
+def make_model():
+    return LogisticRegressionModel(3, array('d', [0.5, -0.25, 1.0]), 0.1)
+
+
+def test_check_rows_accepts_rows_of_model_width():
+    model = make_model()
+    rows = [[1.0, 2.0, 3.0], [0, 1, True]]
+    check_rows(model, rows)
+    assert len(predict_batch(model, rows)) == 2
+
+
+@pytest.mark.parametrize('rows', [
+    [[1.0, 2.0, 3.0, 4.0, 5.0, 6.0]],
+    [[1.0]],
+    [[1.0, 'a', 3.0]],
+    [[1.0, [2.0], 3.0]],
+    [None],
+    None,
+    {'a': 1},
+])
+def test_check_rows_rejects_rows_the_model_would_truncate_or_fail_on(rows):
+    with pytest.raises(InvalidRowsError):
+        check_rows(make_model(), rows)
+
+
+@pytest.mark.parametrize('rows', [
+    # Rows end with their label; the default model has three inputs
+    [[0.5, 1.5, 2.5, 3.5, 4.5, 1]],
+    [[0.5, 1]],
+    [[0.5, 'x', 2.5, 1]],
+])
+def test_evaluate_rejects_rows_of_the_wrong_width(rows):
+    client = importlib.import_module('main').app.test_client()
+    response = client.post('/predict/evaluate', json=rows)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert client.post('/predict/evaluate', json=[[0.5, 1.5, 2.5, 1], [1.0, 0.5, 0.0, 0]]).status_code == 200
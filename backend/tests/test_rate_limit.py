@@ -0,0 +1,79 @@
+import importlib
+import json
+import pytest
+from rate_limit import LocalBuckets, RateLimiter, SharedBuckets, retry_after_header
+
+
+@pytest.fixture(params=['local', 'shared'])
+def buckets(request):
+    if request.param == 'local':
+        yield LocalBuckets()
+    else:
+        shared = SharedBuckets(slots=64)
+        yield shared
+        shared.close()
+
+
+def test_bucket_refills_at_its_rate(buckets):
+    # burst 5, 2 tokens per second
+    for _ in range(5):
+        assert buckets.consume('user:a', 1.0, 2.0, 5.0, now=100.0) == 0.0
+    assert buckets.consume('user:a', 1.0, 2.0, 5.0, now=100.0) == pytest.approx(0.5)
+    # Half a second refills exactly one token
+    assert buckets.consume('user:a', 1.0, 2.0, 5.0, now=100.5) == 0.0
+    assert buckets.consume('user:a', 1.0, 2.0, 5.0, now=100.5) == pytest.approx(0.5)
+    # Never more than the burst, however long the bucket sat idle
+    for _ in range(5):
+        assert buckets.consume('user:a', 1.0, 2.0, 5.0, now=1000.0) == 0.0
+    assert buckets.consume('user:a', 1.0, 2.0, 5.0, now=1000.0) > 0.0
+    # Other keys have their own bucket
+    assert buckets.consume('user:b', 1.0, 2.0, 5.0, now=1000.0) == 0.0
+
+
+def test_cost_grows_with_content_length_and_unknown_length_takes_the_bucket():
+    limiter = RateLimiter(LocalBuckets(), user_rate=1.0, user_burst=10.0, ip_rate=1.0, ip_burst=10.0)
+    assert limiter.cost('predict', 0) == 1.0
+    assert limiter.cost('predict', 2048) == 2.0
+    assert limiter.check('predict', None, ip='10.0.0.1') == 0.0
+    assert limiter.check('predict', 0, ip='10.0.0.1') > 0.0
+    assert limiter.stats()['checked'] == 2
+    assert limiter.stats()['rejected'] == 1
+
+
+def test_retry_after_header_rounds_up_to_whole_seconds():
+    assert retry_after_header(0.01) == '1'
+    assert retry_after_header(1.0) == '1'
+    assert retry_after_header(1.2) == '2'
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    main = importlib.import_module('main')
+    limiter = RateLimiter(LocalBuckets(), user_rate=0.5, user_burst=3.0, ip_rate=0.5, ip_burst=3.0)
+    monkeypatch.setattr(main, 'rate_limiter', limiter)
+    return main
+
+
+def test_oversized_predict_body_is_refused_before_parsing(app_module, monkeypatch):
+    parsed = []
+    original = app_module.prediction_rows
+    monkeypatch.setattr(app_module, 'prediction_rows', lambda *args, **kwargs: parsed.append(1) or original(*args, **kwargs))
+    client = app_module.app.test_client()
+    assert client.post('/predict', json=[[0.5, 1.5, 2.5, 0]]).status_code == 200
+    parsed.clear()
+    # Costs more than the whole bucket, which is no longer full
+    body = json.dumps([[0.5, 1.5, 2.5, 0]] * 2000)
+
+    response = client.post('/predict', data=body, content_type='application/json')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['retry_after'] > 0
+    assert parsed == []
+    assert client.get('/rate-limit').get_json()['rejected'] == 1
+
+
+def test_small_requests_pass_until_the_bucket_is_empty(app_module):
+    client = app_module.app.test_client()
+    statuses = [client.post('/predict', json=[[0.5, 1.5, 2.5, 0]]).status_code for _ in range(4)]
+    assert statuses[:2] == [200, 200]
+    assert statuses[-1] == 429
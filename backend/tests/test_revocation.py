@@ -0,0 +1,68 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from models import Base, RevokedToken
+from revocation import BloomFilter, RevocationList
+
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'revoked.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_revocation_after_prune_reaches_other_workers(tmp_path):
+    engine = make_engine(tmp_path)
+    revoking = RevocationList(engine, sync_interval=0)
+    worker = RevocationList(engine, sync_interval=0)
+
+    soon = datetime.utcnow() + timedelta(seconds=0.2)
+    for jti in ('a', 'b', 'c'):
+        revoking.revoke(jti, soon)
+    assert worker.sync() == 3
+    time.sleep(0.3)
+    revoking.sync()
+    worker.sync()
+    assert not worker.is_revoked('a')
+
+    revoking.revoke('d', datetime.utcnow() + timedelta(minutes=5))
+    worker.sync()
+    assert worker.is_revoked('d')
+
+
+def test_row_committed_below_last_seen_id_is_picked_up(tmp_path):
+    engine = make_engine(tmp_path)
+    revoking = RevocationList(engine, sync_interval=0)
+    worker = RevocationList(engine, sync_interval=0)
+    expires_at = datetime.utcnow() + timedelta(minutes=5)
+    revoking.revoke('first', expires_at)
+    revoking.revoke('second', expires_at)
+    with engine.begin() as conn:
+        conn.execute(insert(RevokedToken).values(id=100, jti='third', expires_at=expires_at))
+    worker.sync()
+
+    # A transaction that took its id earlier but committed later
+    with engine.begin() as conn:
+        conn.execute(insert(RevokedToken).values(id=50, jti='late', expires_at=expires_at))
+    worker.sync()
+    assert worker.is_revoked('late')
+    assert worker.stats()['revoked'] == 4
+
+
+def test_bloom_false_positive_falls_back_to_exact_set(tmp_path):
+    revocations = RevocationList(make_engine(tmp_path), sync_interval=0)
+    revocations.revoke('revoked', datetime.utcnow() + timedelta(minutes=5))
+    # A saturated filter claims every key, as a false positive would
+    revocations._bloom._bits[:] = b'\xff' * len(revocations._bloom._bits)
+    assert 'not-revoked' in revocations._bloom
+    assert not revocations.is_revoked('not-revoked')
+    assert revocations.is_revoked('revoked')
+
+
+def test_bloom_false_positive_rate():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(f'member-{i}')
+    assert all(f'member-{i}' in bloom for i in range(10000))
+    false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+    assert false_positives < 300
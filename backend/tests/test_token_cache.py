@@ -0,0 +1,50 @@
+import time
+from token_cache import VerifiedTokenCache
+
+
+def test_entry_is_dropped_once_the_token_expires():
+    cache = VerifiedTokenCache()
+    cache.put('short', 'alice', 'alice@example.com', time.time() + 0.05, jti='j1')
+    cache.put('long', 'alice', 'alice@example.com', time.time() + 60, jti='j2')
+    assert cache.get('short') == ('alice', 'j1')
+    time.sleep(0.1)
+    assert cache.get('short') is None
+    assert cache.get('long') == ('alice', 'j2')
+
+
+def test_unknown_email_is_forgotten_after_its_ttl():
+    cache = VerifiedTokenCache(unknown_ttl=0.05)
+    cache.mark_unknown('ghost@example.com')
+    assert cache.is_unknown('ghost@example.com')
+    time.sleep(0.1)
+    assert not cache.is_unknown('ghost@example.com')
+
+
+def test_password_change_invalidates_every_cached_token_of_the_user():
+    cache = VerifiedTokenCache()
+    expires_at = time.time() + 60
+    cache.put('first', 'alice', 'alice@example.com', expires_at)
+    cache.put('second', 'alice', 'alice@example.com', expires_at)
+    cache.put('other', 'bob', 'bob@example.com', expires_at)
+    cache.invalidate_user('alice@example.com')
+    assert cache.get('first') is None
+    assert cache.get('second') is None
+    assert cache.get('other') == ('bob', None)
+
+
+def test_user_creation_clears_a_cached_unknown_email():
+    cache = VerifiedTokenCache()
+    cache.mark_unknown('new@example.com')
+    cache.invalidate_user('new@example.com')
+    assert not cache.is_unknown('new@example.com')
+
+
+def test_least_recently_used_token_is_evicted_past_maxsize():
+    cache = VerifiedTokenCache(maxsize=2)
+    expires_at = time.time() + 60
+    cache.put('a', 'alice', 'alice@example.com', expires_at)
+    cache.put('b', 'bob', 'bob@example.com', expires_at)
+    cache.get('a')
+    cache.put('c', 'carol', 'carol@example.com', expires_at)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
@@ -0,0 +1,112 @@
+import random
+import pytest
+from model import LogisticRegressionModel, SparseRow
+from train import train_model
+
+
+class Crash(Exception):
+    pass
+
+
+def make_rows(n=10, seed=7):
+    rng = random.Random(seed)
+    X = [[rng.uniform(-2, 2) for _ in range(3)] for _ in range(n)]
+    y = [1.0 if x[0] - x[2] > 0 else 0.0 for x in X]
+    return X, y
+
+
+def stop_after(epoch, stop=False):
+    def callback(model, progress):
+        if progress['epoch'] == epoch:
+            if not stop:
+                raise Crash()
+            return False
+        return True
+    return callback
+
+
+# 10 rows in batches of 4 make 3 steps per epoch; checkpoint_every=2 lands checkpoints mid-epoch
+PARAMS = dict(num_epochs=8, learning_rate=0.1, l2=0.01, standardize=True, batch_size=4, momentum=0.9, seed=11)
+
+
+@pytest.mark.parametrize('checkpoint_every, stop_epoch, stop', [
+    (3, 3, True),   # stopped at an epoch boundary, checkpoint written on stop
+    (2, 3, False),  # crashed; the last checkpoint is from the middle of epoch 3
+    (5, 3, False),  # crashed a full epoch after the last (mid-epoch 2) checkpoint
+])
+def test_resumed_training_matches_uninterrupted_run(tmp_path, checkpoint_every, stop_epoch, stop):
+    X, y = make_rows()
+    straight = train_model(X, y, 3, callback=None, **PARAMS)
+
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    try:
+        train_model(X, y, 3, callback=stop_after(stop_epoch, stop), checkpoint_path=checkpoint_path,
+                    checkpoint_every=checkpoint_every, **PARAMS)
+    except Crash:
+        pass
+    epochs = []
+    resumed = train_model(X, y, 3, callback=lambda model, progress: epochs.append(progress['epoch']),
+                          checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every,
+                          resume_from=checkpoint_path, **PARAMS)
+
+    # The resumed run picked up from the checkpoint rather than starting over
+    assert epochs[0] > 1 and epochs[-1] == PARAMS['num_epochs']
+
+    assert list(resumed.weights) == list(straight.weights)
+    assert resumed.bias == straight.bias
+    assert list(resumed.standardizer.mean) == list(straight.standardizer.mean)
+
+
+def test_resume_rejects_a_checkpoint_for_other_rows(tmp_path):
+    X, y = make_rows()
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    train_model(X, y, 3, callback=stop_after(1, stop=True), checkpoint_path=checkpoint_path, **PARAMS)
+    with pytest.raises(ValueError):
+        train_model(X[:5], y[:5], 3, callback=None, resume_from=checkpoint_path, **PARAMS)
+
+
+@pytest.mark.parametrize('change', [{'learning_rate': 0.05}, {'batch_size': 5}, {'momentum': 0.0}, {'l2': 0.0}])
+def test_resume_rejects_other_hyperparameters(tmp_path, change):
+    X, y = make_rows()
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    train_model(X, y, 3, callback=stop_after(2, stop=True), checkpoint_path=checkpoint_path, **PARAMS)
+    with pytest.raises(ValueError, match=next(iter(change))):
+        train_model(X, y, 3, callback=None, resume_from=checkpoint_path, **{**PARAMS, **change})
+
+
+def test_existing_raw_weights_are_never_standardized(tmp_path):
+    X, y = make_rows()
+    raw = {**PARAMS, 'standardize': False}
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    model = train_model(X, y, 3, callback=stop_after(2, stop=True), checkpoint_path=checkpoint_path, **raw)
+    with pytest.raises(ValueError, match='standardiz'):
+        train_model(X, y, 3, callback=None, resume_from=checkpoint_path, **PARAMS)
+    with pytest.raises(ValueError, match='standardiz'):
+        train_model(X, y, 3, callback=None, init_model=model, **PARAMS)
+    assert train_model(X, y, 3, callback=None, init_model=model, **raw).standardizer is None
+
+
+def sparse_rows(X):
+    return [SparseRow([j for j, v in enumerate(x) if v], [v for v in x if v]) for x in X]
+
+
+@pytest.mark.parametrize('l2, momentum', [(0.0, 0.0), (0.01, 0.9)])
+def test_sparse_training_matches_dense_training(l2, momentum):
+    X, y = make_rows(20)
+    # Zero out a third of the values so the sparse rows really are sparse
+    X = [[v if (i + j) % 3 else 0.0 for j, v in enumerate(x)] for i, x in enumerate(X)]
+    params = dict(num_epochs=4, learning_rate=0.1, l2=l2, batch_size=4, momentum=momentum, seed=5, callback=None)
+    dense = train_model(X, y, 3, **params)
+    sparse = train_model(sparse_rows(X), y, 3, **params)
+    assert list(sparse.weights) == list(dense.weights)
+    assert sparse.bias == dense.bias
+
+
+def test_sparse_rows_are_checked_against_the_input_size():
+    rows = [SparseRow([0, 5], [1.0, 2.0]), SparseRow([1], [1.0])]
+    with pytest.raises(ValueError, match='input size'):
+        train_model(rows, [1.0, 0.0], 3, num_epochs=1, callback=None)
+    with pytest.raises(ValueError, match='input size'):
+        LogisticRegressionModel(3).partial_fit(rows, [1.0, 0.0])
+    with pytest.raises(ValueError, match='mixed'):
+        train_model([SparseRow([0], [1.0]), [1.0, 0.0, 0.0]], [1.0, 0.0], 3, num_epochs=1, callback=None)
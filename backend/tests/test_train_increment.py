@@ -0,0 +1,64 @@
+import importlib
+from array import array
+
+import pytest
+
+from model import LogisticRegressionModel
+from model_artifact import load_model, save_model
+from model_holder import ModelHolder
+
+ADMIN = {'X-Admin-Token': 'test-admin'}
+ROWS = [[0.5, 1.5, 2.5, 1], [2.0, 0.5, 1.0, 0]]
+FEATURES = [row[:-1] for row in ROWS]
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    main = importlib.import_module('main')
+    path = str(tmp_path / 'model.bin')
+    save_model(LogisticRegressionModel(3, array('d', [0.1, 0.2, 0.3]), 0.0), path)
+    holder = ModelHolder(path, 3)
+    holder.load_initial()
+    monkeypatch.setattr(main, 'model_holder', holder)
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'test-admin')
+    return main
+
+
+@pytest.mark.parametrize('body', [
+    {'rows': [[0.5, 1.5, 2.5, 3.5, 1]]},
+    {'rows': [[0.5, 1.5, 1]]},
+    {'rows': [[0.5, 'x', 2.5, 1]]},
+    {'rows': [[]]},
+    {'rows': [[0.5, float('nan'), 2.5, 1]]},
+    {'rows': ROWS, 'epochs': 0},
+    {'rows': ROWS, 'learning_rate': 'nan'},
+    {'rows': ROWS, 'learning_rate': -0.1},
+    {'rows': ROWS, 'epochs': float('inf')},
+])
+def test_bad_increments_are_rejected_and_leave_the_model_alone(app_module, body):
+    before = list(app_module.model_holder.get().weights)
+    response = app_module.app.test_client().post('/train/increment', json=body, headers=ADMIN)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert list(app_module.model_holder.get().weights) == before
+    assert list(load_model(app_module.model_holder.path).weights) == before
+
+
+def test_increment_is_saved_for_other_workers(app_module):
+    path = app_module.model_holder.path
+    # A second worker process serving the same artifact
+    other = ModelHolder(path, 3)
+    other.load_initial()
+
+    response = app_module.app.test_client().post('/train/increment', json={'rows': ROWS, 'learning_rate': 0.5},
+                                                 headers=ADMIN)
+    assert response.status_code == 200
+    first = list(app_module.model_holder.get().weights)
+    assert list(load_model(path).weights) == first
+
+    # The other worker has not reloaded yet, but its increment still builds on the saved one
+    expected = app_module.model_holder.get().copy()
+    expected.partial_fit(FEATURES, [1, 0], learning_rate=0.5)
+    other.update_artifact(lambda model: model.partial_fit(FEATURES, [1, 0], learning_rate=0.5))
+    assert list(other.get().weights) == list(expected.weights)
+    assert list(load_model(path).weights) == list(expected.weights)
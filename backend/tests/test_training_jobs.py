@@ -0,0 +1,108 @@
+import importlib
+import multiprocessing
+import os
+import random
+import signal
+import time
+
+import pytest
+
+from model_artifact import load_model
+from train import train_model
+from training_jobs import TrainingJobManager
+
+TERMINAL_STATES = ('completed', 'failed', 'cancelled')
+
+
+def make_rows(n=40, seed=3):
+    rng = random.Random(seed)
+    X = [[rng.uniform(-1, 1) for _ in range(3)] for _ in range(n)]
+    y = [1.0 if x[0] + x[1] > 0 else 0.0 for x in X]
+    return X, y
+
+
+def wait_for(manager, job_id, states, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(job_id)
+        if status['state'] in states:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f'job stayed {status["state"]}')
+
+
+def test_missing_warm_start_artifact_fails_the_job(tmp_path):
+    manager = TrainingJobManager(str(tmp_path))
+    X, y = make_rows()
+    job_id = manager.submit(X, y, 3, params={'num_epochs': 2}, init_path=str(tmp_path / 'missing.bin'))
+    status = wait_for(manager, job_id, TERMINAL_STATES)
+    assert status['state'] == 'failed'
+    assert 'missing.bin' in status['error']
+
+
+def test_killed_worker_fails_the_job_and_the_pool_recovers(tmp_path):
+    manager = TrainingJobManager(str(tmp_path))
+    X, y = make_rows()
+    job_id = manager.submit(X, y, 3, params={'num_epochs': 10 ** 7})
+    wait_for(manager, job_id, ('running',))
+    for child in multiprocessing.active_children():
+        os.kill(child.pid, signal.SIGKILL)
+    status = wait_for(manager, job_id, TERMINAL_STATES)
+    assert status['state'] == 'failed'
+
+    job_id = manager.submit(X, y, 3, params={'num_epochs': 2})
+    assert wait_for(manager, job_id, TERMINAL_STATES)['state'] == 'completed'
+
+
+def test_pool_processes_are_spawned_not_forked(tmp_path):
+    manager = TrainingJobManager(str(tmp_path))
+    assert manager._pool()._mp_context.get_start_method() == 'spawn'
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    main = importlib.import_module('main')
+    monkeypatch.setattr(main, 'training_jobs', TrainingJobManager(str(tmp_path)))
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'test-admin')
+    return main
+
+
+@pytest.mark.parametrize('body', [
+    # The default model has three inputs; rows carry a trailing label
+    {'rows': [[0.5, 1.5, 2.5, 3.5, 1]]},
+    {'rows': [[0.5, 1.5, 1]]},
+    {'rows': [[0.5, 1.5, 2.5, 1]], 'validation_rows': [[0.5, 1]]},
+    {'rows': [[0.5, 1.5, 2.5, 1]], 'num_epochs': 0},
+    {'rows': [[0.5, 1.5, 2.5, 1]], 'learning_rate': 'nan'},
+    {'rows': [[0.5, 1.5, 2.5, 1]], 'batch_size': -4},
+    {'rows': [[0.5, 1.5, 2.5, 1]], 'momentum': 1.5},
+])
+def test_bad_jobs_are_rejected_before_queueing(app_module, tmp_path, body):
+    response = app_module.app.test_client().post('/train/jobs', json=body, headers={'X-Admin-Token': 'test-admin'})
+    assert response.status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+def test_resume_takes_the_checkpoint_parameters(tmp_path):
+    manager = TrainingJobManager(str(tmp_path))
+    X, y = make_rows(10)
+    # 10 rows in batches of 4: 3 steps an epoch, so 4 epochs end on a checkpoint
+    params = dict(learning_rate=0.1, l2=0.01, standardize=True, batch_size=4, momentum=0.9, seed=11,
+                  checkpoint_every=2)
+    first = manager.submit(X, y, 3, params={'num_epochs': 4, **params})
+    assert wait_for(manager, first, TERMINAL_STATES)['state'] == 'completed'
+
+    with pytest.raises(ValueError, match='learning_rate'):
+        manager.submit(X, y, 3, params={'learning_rate': 0.5}, resume_from=first)
+    with pytest.raises(ValueError, match='standardize'):
+        manager.submit(X, y, 3, params={'standardize': False}, resume_from=first)
+
+    resumed = manager.submit(X, y, 3, params={'num_epochs': 8}, resume_from=first)
+    status = wait_for(manager, resumed, TERMINAL_STATES)
+    assert status['state'] == 'completed'
+    # checkpoint_every and seed do not change the optimizer's path, so they are not carried over
+    assert status['params'] == {**params, 'num_epochs': 8, 'checkpoint_every': 10, 'seed': None}
+
+    straight = train_model(X, y, 3, num_epochs=8, callback=None,
+                           **{k: v for k, v in params.items() if k != 'checkpoint_every'})
+    assert list(load_model(status['model_path']).weights) == list(straight.weights)
@@ -0,0 +1,39 @@
+import time
+from sqlalchemy import create_engine, select
+from models import Base, User
+from passwords import verify_password
+from token_cache import VerifiedTokenCache
+from user_import import ImportJobManager
+
+
+def test_import_job_creates_users_and_clears_negative_cache_entries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(email='old@example.com', name='Old', hashed_password='x'))
+    cache = VerifiedTokenCache()
+    cache.mark_unknown('new@example.com')
+    imports = ImportJobManager(str(tmp_path / 'jobs'), workers=2, on_created=cache.invalidate_user)
+
+    status = imports.submit([
+        {'email': 'new@example.com', 'password': 'secret-1', 'name': 'New'},
+        {'email': 'old@example.com', 'password': 'secret-2', 'name': 'Old'},
+        {'email': 'new@example.com', 'password': 'secret-3', 'name': 'Again'},
+        {'email': 'partial@example.com'},
+    ], engine)
+    assert status['state'] == 'queued'
+
+    deadline = time.monotonic() + 60
+    while imports.status(status['job_id'])['state'] in ('queued', 'running'):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    report = imports.status(status['job_id'])
+
+    assert report['state'] == 'completed'
+    assert report['created'] == ['new@example.com']
+    assert [entry['reason'] for entry in report['skipped']] == [
+        'already exists', 'duplicate in import', 'email, password and name are required']
+    assert not cache.is_unknown('new@example.com')
+    with engine.connect() as conn:
+        hashed = conn.execute(select(User.hashed_password).where(User.email == 'new@example.com')).scalar()
+    assert verify_password('secret-1', hashed)
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+TOKEN_CACHE_SIZE = 10000
+UNKNOWN_EMAIL_TTL_SECONDS = 30
+
+class VerifiedTokenCache:
+    # Tokens that already passed JWT verification and user lookup, keyed by their SHA-256 digest and
+    # kept until the token's own exp. Emails with no user are remembered briefly as well.
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE, unknown_ttl=UNKNOWN_EMAIL_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.unknown_ttl = unknown_ttl
+        self._tokens = OrderedDict()
+        self._digests_by_email = {}
+        self._unknown_emails = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._tokens.get(digest)
+            if entry is None:
+                return None
+            user, email, expires_at, jti = entry
+            if expires_at <= time.time():
+                self._remove(digest, email)
+                return None
+            self._tokens.move_to_end(digest)
+            return user, jti
+
+    def put(self, token: str, user, email: str, expires_at: float, jti: Optional[str] = None):
+        digest = self._digest(token)
+        with self._lock:
+            self._tokens[digest] = (user, email, expires_at, jti)
+            self._tokens.move_to_end(digest)
+            self._digests_by_email.setdefault(email, set()).add(digest)
+            while len(self._tokens) > self.maxsize:
+                old_digest, (_, old_email, _, _) = self._tokens.popitem(last=False)
+                self._forget_digest(old_digest, old_email)
+
+    def _remove(self, digest, email):
+        del self._tokens[digest]
+        self._forget_digest(digest, email)
+
+    def _forget_digest(self, digest, email):
+        digests = self._digests_by_email.get(email)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._digests_by_email[email]
+
+    def invalidate_user(self, email: str):
+        # Call whenever a user is changed or deleted, so no stale copy is served
+        with self._lock:
+            for digest in self._digests_by_email.pop(email, ()):
+                self._tokens.pop(digest, None)
+            self._unknown_emails.pop(email, None)
+
+    def is_unknown(self, email: str):
+        with self._lock:
+            expires_at = self._unknown_emails.get(email)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._unknown_emails[email]
+                return False
+            return True
+
+    def mark_unknown(self, email: str):
+        with self._lock:
+            if len(self._unknown_emails) >= self.maxsize:
+                self._unknown_emails.clear()
+            self._unknown_emails[email] = time.monotonic() + self.unknown_ttl
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._digests_by_email.clear()
+            self._unknown_emails.clear()
+
+token_cache = VerifiedTokenCache()
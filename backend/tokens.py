@@ -0,0 +1,31 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from jose import jwt
+
+# JWT primitives shared by the FastAPI auth dependencies and the Flask routes
+SECRET_KEY = "your-secret-key-here"  
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=15)
+    # jti identifies the token for revocation
+    to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def decode_access_token(token: str):
+    # Raises jose.JWTError for bad signatures and expired tokens
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+def bearer_token(authorization: Optional[str]):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
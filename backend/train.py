@@ -1,43 +1,262 @@
+import json
 import math
-from model import LogisticRegressionModel
+import os
+import random
+import time
+from array import array
+from model import LogisticRegressionModel, MultinomialLogisticModel, SparseRow, add_scaled, check_sparse_rows
+from standardizer import Standardizer
 from data_preparation import prepare_data
 
-def train_model(X, y, input_size, num_epochs=100, learning_rate=0.01):
-    model = LogisticRegressionModel(input_size)
+def print_progress(model, progress):
+    if progress['epoch'] % 10 == 0:
+        print(f"Epoch [{progress['epoch']}/{progress['num_epochs']}], Loss: {progress['loss']:.4f}")
+
+CHECKPOINT_VERSION = 1
+# Hyperparameters that shape the optimizer's path; a resumed run must use the checkpoint's values
+RESUME_PARAMS = ('learning_rate', 'l2', 'batch_size', 'momentum')
+
+def save_checkpoint(path, state):
+    # Write to a sibling file and rename, so a crash never leaves a truncated checkpoint behind
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path):
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f'{path}: unsupported checkpoint version {state.get("version")}')
+    return state
+
+def _progress(started, epoch, start_epoch, num_epochs, n, loss):
+    # The dict passed to training callbacks; start_epoch is where this run (or its resume) began
+    elapsed = time.perf_counter() - started
+    done = epoch - start_epoch
+    return {
+        'epoch': epoch,
+        'num_epochs': num_epochs,
+        'loss': loss,
+        'rows_per_second': done * n / elapsed if elapsed > 0 else 0.0,
+        'eta_seconds': elapsed / done * (num_epochs - epoch),
+    }
+
+def _rng_state(state):
+    # JSON turns random.getstate() tuples into lists
+    version, internal, gauss_next = state
+    return version, tuple(internal), gauss_next
+
+def train_model(X, y, input_size, num_epochs=100, learning_rate=0.01, callback=print_progress,
+                init_model=None, l2=0.0, standardize=False, batch_size=None, momentum=0.0, seed=None,
+                checkpoint_path=None, checkpoint_every=0, resume_from=None):
+    # callback(model, progress) is called after every epoch; returning False stops training early.
+    # init_model warm-starts from existing weights (e.g. a loaded artifact). batch_size=None keeps
+    # full-batch gradient descent, otherwise each epoch walks a seeded shuffle in mini-batches.
+    # With checkpoint_path the full training state is written every checkpoint_every steps (and when
+    # stopped early); resume_from continues a run from such a checkpoint exactly where it stopped.
+    rng = random.Random(seed)
     
     # Convert to lists if needed
     if not isinstance(X, list):
         X = list(X)
     if not isinstance(y, list):
         y = list(y)
+    n = len(X)
+
+    state = load_checkpoint(resume_from) if resume_from is not None else None
+    if state is not None:
+        if state['input_size'] != input_size or state['rows'] != n:
+            raise ValueError(f'{resume_from}: checkpoint is for {state["rows"]} rows of {state["input_size"]} '
+                             f'features, got {n} rows of {input_size}')
+        given = {'learning_rate': learning_rate, 'l2': l2, 'batch_size': batch_size, 'momentum': momentum}
+        for name in RESUME_PARAMS:
+            if name in state['params'] and state['params'][name] != given[name]:
+                raise ValueError(f'{resume_from}: checkpoint was trained with {name}={state["params"][name]!r}, '
+                                 f'got {given[name]!r}')
+        standardizer = None
+        if state['standardizer'] is not None:
+            standardizer = Standardizer(input_size, **state['standardizer'])
+        model = LogisticRegressionModel(input_size, array('d', state['weights']), state['bias'],
+                                        standardizer=standardizer)
+    elif init_model is not None:
+        model = init_model.copy()
+    else:
+        model = LogisticRegressionModel(input_size, array('d', (rng.gauss(0, 0.01) for _ in range(input_size))))
+
+    sparse = bool(X) and X[0].__class__ is SparseRow
+    if sparse:
+        check_sparse_rows(X, input_size)
+    if sparse and (standardize or model.standardizer is not None):
+        # Centring would turn every implicit zero into a non-zero
+        raise ValueError("sparse rows cannot be standardized")
+    # Without L2 or momentum a step only moves the weights of the batch's non-zeros, so sparse batches
+    # skip the pass over every weight; with either, every weight moves every step
+    sparse_steps = sparse and l2 == 0 and momentum == 0
+
+    # Train in standardized space; the standardizer stays attached and is folded in at predict time
+    if standardize and model.standardizer is None:
+        if state is not None or init_model is not None:
+            # The starting weights were trained on raw features and mean nothing in standardized space
+            raise ValueError("cannot standardize: the starting weights were trained without standardization")
+        model.standardizer = Standardizer.fit(X, input_size)
+    if model.standardizer is not None:
+        X = model.standardizer.transform_batch(X)
+
+    # Optimizer (momentum) state and the data cursor: epoch, next row of the epoch's order, step count
+    weights = model.weights
+    velocity = array('d', [0.0] * input_size)
+    bias_velocity = 0.0
+    epoch, cursor, steps, loss_sum = 0, 0, 0, 0.0
+    epoch_rng_state = None
+    if state is not None:
+        velocity = array('d', state['velocity'])
+        bias_velocity = state['bias_velocity']
+        epoch, cursor, steps, loss_sum = state['epoch'], state['cursor'], state['steps'], state['loss_sum']
+        rng.setstate(_rng_state(state['rng_state']))
+        if cursor:
+            epoch_rng_state = _rng_state(state['epoch_rng_state'])
+    step_size = batch_size or n
+
+    def checkpoint():
+        save_checkpoint(checkpoint_path, {
+            'version': CHECKPOINT_VERSION,
+            'input_size': input_size,
+            'rows': n,
+            'weights': list(weights),
+            'bias': model.bias,
+            'standardizer': None if model.standardizer is None else {
+                'mean': list(model.standardizer.mean),
+                'std': list(model.standardizer.std),
+                'count': model.standardizer.count,
+            },
+            'velocity': list(velocity),
+            'bias_velocity': bias_velocity,
+            'epoch': epoch,
+            'cursor': cursor,
+            'steps': steps,
+            'loss_sum': loss_sum,
+            'rng_state': rng.getstate(),
+            'epoch_rng_state': epoch_rng_state,
+            'params': {'num_epochs': num_epochs, 'learning_rate': learning_rate, 'l2': l2,
+                       'batch_size': batch_size, 'momentum': momentum},
+        })
     
-    # Simple gradient descent training
-    for epoch in range(num_epochs):
-        predictions = []
-        losses = []
-        
-        # Forward pass for all samples
-        for i in range(len(X)):
-            pred = model.predict(X[i])
-            predictions.append(pred)
-            
-            # Compute loss for this sample
-            loss = -(y[i] * math.log(pred + 1e-8) + (1 - y[i]) * math.log(1 - pred + 1e-8))
-            losses.append(loss)
-        
-        # Compute average loss
-        avg_loss = sum(losses) / len(losses)
-        
-        # Compute gradients
-        for j in range(input_size):
-            gradient = sum((predictions[i] - y[i]) * X[i][j] for i in range(len(X))) / len(X)
-            model.weights[j][0] -= learning_rate * gradient
-        
-        # Update bias
-        bias_gradient = sum(predictions[i] - y[i] for i in range(len(X))) / len(X)
-        model.bias -= learning_rate * bias_gradient
+    # Gradient descent, optionally with mini-batches and momentum
+    started = time.perf_counter()
+    start_epoch = epoch
+    while epoch < num_epochs:
+        # The shuffle is replayed from the RNG state saved at the start of the epoch when resuming mid-epoch
+        if cursor == 0:
+            epoch_rng_state = rng.getstate()
+        else:
+            rng.setstate(epoch_rng_state)
+        order = list(range(n))
+        if batch_size:
+            rng.shuffle(order)
+
+        while cursor < n:
+            batch = order[cursor:cursor + step_size]
+            gradients = {} if sparse_steps else [0.0] * input_size
+            bias_gradient = 0.0
+            for i in batch:
+                pred = model.sigmoid(model.dot_product(X[i], weights) + model.bias)
+                # Compute loss for this sample
+                loss_sum -= y[i] * math.log(pred + 1e-8) + (1 - y[i]) * math.log(1 - pred + 1e-8)
+                # Scatter the row into the gradient (cost scales with non-zeros)
+                if sparse_steps:
+                    for j, value in zip(X[i].indices, X[i].values):
+                        gradients[j] = gradients.get(j, 0.0) + (pred - y[i]) * value
+                else:
+                    add_scaled(gradients, X[i], pred - y[i])
+                bias_gradient += pred - y[i]
+
+            if sparse_steps:
+                # The same update as below with l2 and momentum at 0; velocity is unused then
+                for j, gradient in gradients.items():
+                    weights[j] -= learning_rate * (gradient / len(batch))
+            else:
+                for j in range(input_size):
+                    # L2 penalty (the bias is not regularized)
+                    gradient = gradients[j] / len(batch) + l2 * weights[j]
+                    velocity[j] = momentum * velocity[j] + gradient
+                    weights[j] -= learning_rate * velocity[j]
+            bias_velocity = momentum * bias_velocity + bias_gradient / len(batch)
+            model.bias -= learning_rate * bias_velocity
+            model.clear_serving_cache()
+
+            cursor += len(batch)
+            steps += 1
+            if checkpoint_path and checkpoint_every and steps % checkpoint_every == 0 and cursor < n:
+                checkpoint()
+
+        avg_loss = loss_sum / n
+        epoch += 1
+        cursor, loss_sum = 0, 0.0
+        if checkpoint_path and checkpoint_every and steps % checkpoint_every == 0:
+            checkpoint()
         
-        if (epoch + 1) % 10 == 0:
-            print(f'Epoch [{epoch + 1}/{num_epochs}], Loss: {avg_loss:.4f}')
+        if callback is not None:
+            progress = _progress(started, epoch, start_epoch, num_epochs, n, avg_loss)
+            if callback(model, progress) is False:
+                if checkpoint_path:
+                    checkpoint()
+                break
     
     return model
+
+def train_multinomial(X, labels, input_size, classes=None, num_epochs=100, learning_rate=0.1,
+                      callback=print_progress, l2=0.0, standardize=False):
+    # Softmax regression by full-batch gradient descent; labels are class names (e.g. "Ecologic")
+    if not isinstance(X, list):
+        X = list(X)
+    labels = list(labels)
+    if classes is None:
+        classes = list(dict.fromkeys(labels))
+    class_index = {name: c for c, name in enumerate(classes)}
+    try:
+        targets = [class_index[label] for label in labels]
+    except KeyError as e:
+        raise ValueError(f"label {e.args[0]!r} is not one of the classes {classes}") from None
+
+    model = MultinomialLogisticModel(input_size, classes)
+    sparse = bool(X) and X[0].__class__ is SparseRow
+    if standardize:
+        if sparse:
+            raise ValueError("sparse rows cannot be standardized")
+        model.standardizer = Standardizer.fit(X, input_size)
+        X = model.standardizer.transform_batch(X)
+
+    n_classes = len(classes)
+    weights = model.weights
+    started = time.perf_counter()
+    for epoch in range(num_epochs):
+        # Logits straight from the raw (training-space) weights; the serving cache is rebuilt after training
+        class_rows = [weights[c * input_size:(c + 1) * input_size] for c in range(n_classes)]
+        gradients = [[0.0] * input_size for _ in range(n_classes)]
+        bias_gradients = [0.0] * n_classes
+        total_loss = 0.0
+        for x, target in zip(X, targets):
+            logits = [model.dot_product(x, w) + b for w, b in zip(class_rows, model.bias)]
+            probabilities = model.softmax(logits)
+            total_loss -= math.log(probabilities[target] + 1e-8)
+            for c in range(n_classes):
+                error = probabilities[c] - (1.0 if c == target else 0.0)
+                add_scaled(gradients[c], x, error)
+                bias_gradients[c] += error
+        n = len(X)
+        for c in range(n_classes):
+            offset = c * input_size
+            for j in range(input_size):
+                weights[offset + j] -= learning_rate * (gradients[c][j] / n + l2 * weights[offset + j])
+            model.bias[c] -= learning_rate * bias_gradients[c] / n
+        model.clear_serving_cache()
+
+        if callback is not None:
+            progress = _progress(started, epoch + 1, 0, num_epochs, n, total_loss / n)
+            if callback(model, progress) is False:
+                break
+
+    return model
@@ -0,0 +1,201 @@
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from metrics import evaluate_in_chunks
+from model_artifact import load_model, save_model
+from train import RESUME_PARAMS, load_checkpoint, train_model
+
+# Each job owns a directory holding status.json, its checkpoint and final artifact.
+# Status lives on disk so any gunicorn worker can report or cancel any job.
+STATUS_FILE = 'status.json'
+CANCEL_FILE = 'cancel'
+CHECKPOINT_FILE = 'checkpoint.json'
+MODEL_FILE = 'model.bin'
+STATUS_INTERVAL = 0.5
+DEFAULT_PARAMS = {
+    'num_epochs': 100, 'learning_rate': 0.01, 'l2': 0.0, 'standardize': True, 'checkpoint_every': 10,
+    'batch_size': None, 'momentum': 0.0, 'seed': None,
+}
+
+
+class UnknownJobError(LookupError):
+    pass
+
+
+def _write_status(job_dir, status):
+    tmp_path = os.path.join(job_dir, f'{STATUS_FILE}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, os.path.join(job_dir, STATUS_FILE))
+
+
+def _read_status(job_dir):
+    with open(os.path.join(job_dir, STATUS_FILE)) as f:
+        return json.load(f)
+
+
+def _run_job(job_dir, X, y, input_size, params, feature_names, init_path, resume_path, validation):
+    status = _read_status(job_dir)
+    cancel_path = os.path.join(job_dir, CANCEL_FILE)
+    if os.path.exists(cancel_path):
+        status['state'] = 'cancelled'
+        _write_status(job_dir, status)
+        return status
+
+    num_epochs = params['num_epochs']
+    status.update(state='running', started_at=time.time())
+    _write_status(job_dir, status)
+    last_write = 0.0
+
+    def on_progress(model, progress):
+        nonlocal last_write
+        status['progress'] = progress
+        if os.path.exists(cancel_path):
+            # train_model writes a final checkpoint when stopped
+            status['state'] = 'cancelled'
+            return False
+        now = time.monotonic()
+        if now - last_write >= STATUS_INTERVAL:
+            _write_status(job_dir, status)
+            last_write = now
+        return True
+
+    try:
+        init_model = load_model(init_path, expected_input_size=input_size) if init_path is not None else None
+        model = train_model(
+            X, y, input_size,
+            num_epochs=num_epochs,
+            learning_rate=params['learning_rate'],
+            l2=params['l2'],
+            standardize=params['standardize'],
+            batch_size=params['batch_size'],
+            momentum=params['momentum'],
+            seed=params['seed'],
+            callback=on_progress,
+            init_model=init_model,
+            checkpoint_path=os.path.join(job_dir, CHECKPOINT_FILE),
+            checkpoint_every=params['checkpoint_every'],
+            resume_from=resume_path,
+        )
+    except Exception as e:
+        status.update(state='failed', error=str(e), finished_at=time.time())
+        _write_status(job_dir, status)
+        return status
+
+    if status['state'] != 'cancelled':
+        save_model(model, os.path.join(job_dir, MODEL_FILE), feature_names,
+                   metadata={'epoch': num_epochs, 'num_epochs': num_epochs})
+        # Held-out rows when given, otherwise the training rows
+        X_eval, y_eval = validation if validation is not None else (X, y)
+        status['metrics'] = evaluate_in_chunks(model, X_eval, y_eval).report()
+        status['metrics']['dataset'] = 'validation' if validation is not None else 'training'
+        status.update(state='completed', model_path=os.path.join(job_dir, MODEL_FILE))
+    status['finished_at'] = time.time()
+    _write_status(job_dir, status)
+    return status
+
+
+def _job_finished(job_dir, future):
+    # Done-callback in the web worker: a child that died (or an error outside _run_job's own
+    # handling) never writes its status, so record the failure here
+    error = future.exception() if not future.cancelled() else 'cancelled before it started'
+    if error is None:
+        return
+    try:
+        status = _read_status(job_dir)
+        if status['state'] in ('queued', 'running'):
+            status.update(state='failed', error=str(error) or type(error).__name__, finished_at=time.time())
+            _write_status(job_dir, status)
+    except Exception as e:
+        print(f"Could not record the failure of training job {os.path.basename(job_dir)}: {e}")
+
+
+class TrainingJobManager:
+    def __init__(self, root, max_workers=1):
+        self.root = root
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        # Created lazily so each forked web worker owns its own pool. The web worker already runs
+        # threads (model watcher, evaluation writer, revocation sync), and forking a threaded process
+        # can leave a lock held forever in the child, so the pool's processes are spawned instead.
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            self._pid = os.getpid()
+        return self._executor
+
+    def _job_dir(self, job_id):
+        if not job_id.isalnum():
+            raise UnknownJobError(f'unknown training job {job_id!r}')
+        job_dir = os.path.join(self.root, job_id)
+        if not os.path.isdir(job_dir):
+            raise UnknownJobError(f'unknown training job {job_id!r}')
+        return job_dir
+
+    def submit(self, X, y, input_size, params=None, feature_names=None, resume_from=None, validation=None,
+               init_path=None):
+        # resume_from continues another job from its last checkpoint (same rows required);
+        # init_path warm-starts a fresh run from a model artifact. params holds only what the caller
+        # chose: a resumed run takes the rest from its checkpoint and may not change the optimizer's
+        # hyperparameters, other runs take DEFAULT_PARAMS.
+        params = dict(params or {})
+        resume_path = None
+        if resume_from is not None:
+            resume_path = os.path.join(self._job_dir(resume_from), CHECKPOINT_FILE)
+            if not os.path.exists(resume_path):
+                raise UnknownJobError(f'training job {resume_from!r} has no checkpoint to resume from')
+            state = load_checkpoint(resume_path)
+            for name in RESUME_PARAMS:
+                if name in params and params[name] != state['params'][name]:
+                    raise ValueError(f'job {resume_from} was trained with {name}={state["params"][name]!r}; '
+                                     f'leave {name} out to resume with it')
+            standardized = state['standardizer'] is not None
+            if params.get('standardize', standardized) != standardized:
+                raise ValueError(f'job {resume_from} was trained with standardize={standardized}; '
+                                 'leave standardize out to resume with it')
+            params = {**state['params'], 'standardize': standardized, **params}
+        elif init_path is not None:
+            # A warm start keeps the artifact's own standardizer, if it has one
+            params.setdefault('standardize', False)
+        params = {**DEFAULT_PARAMS, **params}
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.root, job_id)
+        os.makedirs(job_dir)
+        _write_status(job_dir, {
+            'job_id': job_id,
+            'state': 'queued',
+            'params': params,
+            'rows': len(X),
+            'resumed_from': resume_from,
+            'warm_start': init_path,
+            'submitted_at': time.time(),
+        })
+        rows = [list(row) for row in X]
+        if validation is not None:
+            validation = ([list(row) for row in validation[0]], list(validation[1]))
+        args = (_run_job, job_dir, rows, list(y), input_size, params, feature_names, init_path, resume_path,
+                validation)
+        try:
+            future = self._pool().submit(*args)
+        except BrokenProcessPool:
+            # A killed child breaks the whole pool; start a fresh one for this and later jobs
+            self._executor = None
+            future = self._pool().submit(*args)
+        future.add_done_callback(lambda done: _job_finished(job_dir, done))
+        return job_id
+
+    def status(self, job_id):
+        return _read_status(self._job_dir(job_id))
+
+    def cancel(self, job_id):
+        job_dir = self._job_dir(job_id)
+        open(os.path.join(job_dir, CANCEL_FILE), 'w').close()
+        return _read_status(job_dir)
@@ -0,0 +1,157 @@
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from model_artifact import save_model
+from train import train_model
+
+DEFAULT_SPACE = {
+    'num_epochs': [50, 100, 200],
+    'learning_rate': [0.001, 0.01, 0.1, 0.5],
+    'l2': [0.0, 0.001, 0.01, 0.1],
+}
+
+# Read-only training data, sent once to each pool worker by _init_worker
+_data = {}
+
+
+def k_fold_indices(n_rows, k, seed=0):
+    if not 2 <= k <= n_rows:
+        raise ValueError(f'need 2 <= k <= {n_rows} folds, got {k}')
+    order = list(range(n_rows))
+    random.Random(seed).shuffle(order)
+    folds = [order[i::k] for i in range(k)]
+    return [
+        ([i for j, fold in enumerate(folds) if j != held_out for i in fold], folds[held_out])
+        for held_out in range(k)
+    ]
+
+
+def grid_search_space(space):
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_search_space(space, n_configs, seed=0):
+    # Lists are sampled uniformly; (low, high) tuples log-uniformly when both ends are positive
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_configs):
+        config = {}
+        for key, values in sorted(space.items()):
+            if isinstance(values, tuple):
+                low, high = values
+                if low > 0 and high > 0:
+                    config[key] = math.exp(rng.uniform(math.log(low), math.log(high)))
+                else:
+                    config[key] = rng.uniform(low, high)
+                if isinstance(low, int) and isinstance(high, int):
+                    config[key] = int(round(config[key]))
+            else:
+                config[key] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def _init_worker(X, y, input_size, folds):
+    _data.update(X=X, y=y, input_size=input_size, folds=folds)
+
+
+def _score(model, X, y):
+    predictions = model.predict_batch(X)
+    log_loss = -sum(
+        t * math.log(p + 1e-8) + (1 - t) * math.log(1 - p + 1e-8) for p, t in zip(predictions, y)
+    ) / len(y)
+    accuracy = sum((p >= 0.5) == (t >= 0.5) for p, t in zip(predictions, y)) / len(y)
+    return log_loss, accuracy
+
+
+def _evaluate_fold(task):
+    config_index, config, fold_index = task
+    X, y = _data['X'], _data['y']
+    train_idx, val_idx = _data['folds'][fold_index]
+    model = train_model(
+        [X[i] for i in train_idx], [y[i] for i in train_idx], _data['input_size'],
+        num_epochs=config.get('num_epochs', 100),
+        learning_rate=config.get('learning_rate', 0.01),
+        l2=config.get('l2', 0.0),
+        standardize=config.get('standardize', True),
+        callback=None,
+    )
+    log_loss, accuracy = _score(model, [X[i] for i in val_idx], [y[i] for i in val_idx])
+    return config_index, log_loss, accuracy
+
+
+def cross_validate(X, y, input_size, configs, k=5, max_workers=None, seed=0, output_path=None, feature_names=None):
+    X = [list(row) for row in X]
+    y = list(y)
+    folds = k_fold_indices(len(X), k, seed)
+    tasks = [(i, config, fold) for i, config in enumerate(configs) for fold in range(k)]
+    workers = max_workers or os.cpu_count() or 1
+    fold_scores = [[] for _ in configs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X, y, input_size, folds)) as pool:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        for config_index, log_loss, accuracy in pool.map(_evaluate_fold, tasks, chunksize=chunksize):
+            fold_scores[config_index].append((log_loss, accuracy))
+
+    results = []
+    for config, scores in zip(configs, fold_scores):
+        losses = [loss for loss, _ in scores]
+        accuracies = [accuracy for _, accuracy in scores]
+        results.append({
+            'config': config,
+            'log_loss': statistics.fmean(losses),
+            'log_loss_std': statistics.pstdev(losses),
+            'accuracy': statistics.fmean(accuracies),
+            'accuracy_std': statistics.pstdev(accuracies),
+        })
+    results.sort(key=lambda result: result['log_loss'])
+
+    best = results[0]
+    report = {'folds': k, 'results': results, 'best': best}
+    if output_path is not None:
+        # Refit the winning configuration on all rows
+        model = train_model(
+            X, y, input_size,
+            num_epochs=best['config'].get('num_epochs', 100),
+            learning_rate=best['config'].get('learning_rate', 0.01),
+            l2=best['config'].get('l2', 0.0),
+            standardize=best['config'].get('standardize', True),
+            callback=None,
+        )
+        save_model(model, output_path, feature_names, metadata={'tuning': best})
+        report['model_path'] = output_path
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    from data_preparation import FeatureSchema, prepare_data
+
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter search for the logistic model')
+    parser.add_argument('data', help='JSON file with a list of labeled rows')
+    parser.add_argument('--features', help='comma-separated feature columns (default: all but the last value)')
+    parser.add_argument('--label', help='label column, required with --features')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--random', type=int, default=0, help='sample N random configurations instead of the grid')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the refitted best model to this artifact path')
+    args = parser.parse_args()
+
+    with open(args.data) as f:
+        rows = json.load(f)
+    schema = FeatureSchema(args.features.split(','), args.label) if args.features else None
+    X, y = prepare_data(rows, schema=schema)
+    feature_names = schema.features if schema else None
+    configs = (random_search_space({'num_epochs': (20, 500), 'learning_rate': (1e-4, 1.0), 'l2': (1e-5, 1.0)},
+                                   args.random, args.seed)
+               if args.random else grid_search_space(DEFAULT_SPACE))
+    report = cross_validate(X, y, len(X[0]), configs, k=args.folds, max_workers=args.workers,
+                            seed=args.seed, output_path=args.output, feature_names=feature_names)
+    print(json.dumps(report, indent=2))
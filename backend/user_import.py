@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from models import User
+from passwords import get_password_hash
+
+INSERT_BATCH_SIZE = 1000
+LOOKUP_CHUNK_SIZE = 500
+
+
+class UnknownImportError(LookupError):
+    pass
+
+
+def _validate(rows):
+    accepted = []
+    skipped = []
+    seen = set()
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            skipped.append({'row': index, 'email': None, 'reason': 'not an object'})
+            continue
+        email = str(row.get('email') or '').strip()
+        if not email or not row.get('password') or not row.get('name'):
+            skipped.append({'row': index, 'email': email or None, 'reason': 'email, password and name are required'})
+        elif email in seen:
+            skipped.append({'row': index, 'email': email, 'reason': 'duplicate in import'})
+        else:
+            seen.add(email)
+            accepted.append((index, email, str(row['password']), str(row['name'])))
+    return accepted, skipped
+
+
+def _existing_emails(conn, emails):
+    existing = set()
+    for start in range(0, len(emails), LOOKUP_CHUNK_SIZE):
+        chunk = emails[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(conn.execute(select(User.email).where(User.email.in_(chunk))).scalars())
+    return existing
+
+
+def _insert_batch(engine, batch):
+    # One executemany per transaction; a conflicting concurrent insert sends just that batch
+    # down the row-by-row path
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(User), batch)
+        return batch, []
+    except IntegrityError:
+        pass
+    created, conflicts = [], []
+    for row in batch:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(User), row)
+            created.append(row)
+        except IntegrityError:
+            conflicts.append(row)
+    return created, conflicts
+
+
+def import_users(rows, engine, workers=None, batch_size=INSERT_BATCH_SIZE, executor=None):
+    # rows: [{"email", "password", "name"}, ...]. Passwords are hashed across executor (a fresh
+    # process pool when none is given), the users inserted batch_size rows per transaction
+    started = time.perf_counter()
+    accepted, skipped = _validate(rows)
+    with engine.connect() as conn:
+        existing = _existing_emails(conn, [email for _, email, _, _ in accepted])
+    pending = []
+    for index, email, password, name in accepted:
+        if email in existing:
+            skipped.append({'row': index, 'email': email, 'reason': 'already exists'})
+        else:
+            pending.append((index, email, password, name))
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(pending) // (workers * 4))
+    passwords = [password for _, _, password, _ in pending]
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(get_password_hash, passwords, chunksize=chunksize))
+    else:
+        hashes = executor.map(get_password_hash, passwords, chunksize=chunksize)
+    records = [
+        {'email': email, 'name': name, 'hashed_password': hashed}
+        for (_, email, _, name), hashed in zip(pending, hashes)
+    ]
+    hashed_at = time.perf_counter()
+
+    created = []
+    row_index = {email: index for index, email, _, _ in pending}
+    for start in range(0, len(records), batch_size):
+        batch_created, conflicts = _insert_batch(engine, records[start:start + batch_size])
+        created.extend(record['email'] for record in batch_created)
+        skipped.extend({'row': row_index[record['email']], 'email': record['email'], 'reason': 'already exists'}
+                       for record in conflicts)
+
+    skipped.sort(key=lambda entry: entry['row'])
+    return {
+        'created': created,
+        'skipped': skipped,
+        'hash_seconds': hashed_at - started,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+class ImportJobManager:
+    # Imports from the web app run in the background, one at a time, so no request waits on bcrypt.
+    # Hashing uses threads (bcrypt releases the GIL) rather than forking a pool from a threaded
+    # server worker. Status files live on disk so any worker can report any job; on_created(email)
+    # is called for each new user once the job has committed.
+    def __init__(self, root, workers, on_created=None):
+        self.root = root
+        self.workers = workers
+        self.on_created = on_created
+        self._runner = None
+        self._hashers = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pools(self):
+        # Created lazily so each forked web worker owns its threads
+        with self._lock:
+            if self._pid != os.getpid():
+                self._runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='user-import')
+                self._hashers = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='user-import-bcrypt')
+                self._pid = os.getpid()
+            return self._runner, self._hashers
+
+    def _path(self, job_id):
+        if not job_id.isalnum():
+            raise UnknownImportError(f'unknown import job {job_id!r}')
+        return os.path.join(self.root, f'{job_id}.json')
+
+    def _write(self, status):
+        path = self._path(status['job_id'])
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(status, f)
+        os.replace(f'{path}.tmp', path)
+
+    def submit(self, rows, engine):
+        os.makedirs(self.root, exist_ok=True)
+        status = {'job_id': uuid.uuid4().hex, 'state': 'queued', 'rows': len(rows), 'submitted_at': time.time()}
+        self._write(status)
+        runner, hashers = self._pools()
+        runner.submit(self._run, dict(status), rows, engine, hashers)
+        return status
+
+    def _run(self, status, rows, engine, hashers):
+        status.update(state='running', started_at=time.time())
+        self._write(status)
+        try:
+            report = import_users(rows, engine, workers=self.workers, executor=hashers)
+        except Exception as e:
+            print(f"User import {status['job_id']} failed: {e}")
+            status.update(state='failed', error=str(e), finished_at=time.time())
+            self._write(status)
+            return
+        if self.on_created is not None:
+            for email in report['created']:
+                self.on_created(email)
+        status.update(report, state='completed', finished_at=time.time())
+        self._write(status)
+
+    def status(self, job_id):
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UnknownImportError(f'unknown import job {job_id!r}') from None
+
+
+if __name__ == '__main__':
+    import argparse
+    import csv
+    from database import engine
+    from models import Base
+
+    parser = argparse.ArgumentParser(description='Create users in bulk from a CSV (email,password,name) or JSON file')
+    parser.add_argument('path')
+    parser.add_argument('--workers', type=int, default=None, help='password hashing processes (default: all cores)')
+    parser.add_argument('--batch-size', type=int, default=INSERT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with open(args.path, newline='') as f:
+        rows = json.load(f) if args.path.endswith('.json') else list(csv.DictReader(f))
+    Base.metadata.create_all(bind=engine)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        report = import_users(rows, engine, workers=args.workers, batch_size=args.batch_size, executor=pool)
+    print(json.dumps({'created': len(report['created']), 'skipped': report['skipped'],
+                      'hash_seconds': round(report['hash_seconds'], 2), 'seconds': round(report['seconds'], 2)},
+                     indent=2))
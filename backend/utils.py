@@ -1,7 +1,11 @@
+import os
 import requests
 
+ENERGY_API_URL = os.environ.get("ENERGY_API_URL", "https://api.electricitymap.org/v3/power-breakdown/latest")
+ENERGY_API_TIMEOUT = float(os.environ.get("ENERGY_API_TIMEOUT", 10.0))
+
 def get_energy_data_for_portugal(api_key):
-    api_url = "https://api.electricitymap.org/v3/power-breakdown/latest"
+    api_url = ENERGY_API_URL
     headers = {
         'Authorization': f'Bearer {api_key}'
     }
@@ -12,12 +16,28 @@ def get_energy_data_for_portugal(api_key):
         print(f"Error fetching energy data for PT: {e}")
         return None
 
+async def get_energy_data_for_portugal_async(api_key, client):
+    # Same result as get_energy_data_for_portugal, awaited on a shared httpx.AsyncClient
+    headers = {
+        'Authorization': f'Bearer {api_key}'
+    }
+
+    try:
+        print("Fetching energy data for PT...")
+        response = await client.get(f"{ENERGY_API_URL}?zone=PT", headers=headers, timeout=ENERGY_API_TIMEOUT)
+        response.raise_for_status()
+        return _energy_summary(response.json())
+    except Exception as e:
+        print(f"Error fetching energy data for PT: {e}")
+        return None
+
 def _extracted_get_energy_data_for_portugal(api_url, headers):
     print("Fetching energy data for PT...")
-    response = requests.get(f"{api_url}?zone=PT", headers=headers)
+    response = requests.get(f"{api_url}?zone=PT", headers=headers, timeout=ENERGY_API_TIMEOUT)
     response.raise_for_status()
-    data = response.json()
+    return _energy_summary(response.json())
 
+def _energy_summary(data):
     renewable_percentage = data.get("renewablePercentage", 0)
     fossil_free_percentage = data.get("fossilFreePercentage", 0)
     base_values = {
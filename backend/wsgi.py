@@ -1,8 +1,10 @@
-from main import app
+from main import app, model_holder, MODEL_WATCH_INTERVAL
 
 # Expose `app` for WSGI servers (e.g., gunicorn wsgi:app)
 
 if __name__ == "__main__":
     import os
+    if MODEL_WATCH_INTERVAL > 0:
+        model_holder.watch(MODEL_WATCH_INTERVAL)
     port = int(os.environ.get("PORT", 5001))
     app.run(host="0.0.0.0", port=port)